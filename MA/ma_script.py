@@ -1,270 +1,281 @@
-import pandas as pd
 import os
-from openpyxl import Workbook
-from openpyxl.styles import Font, Alignment, PatternFill
+import sys
+import argparse
 from datetime import datetime
 import warnings
 from openpyxl.utils.exceptions import InvalidFileException
-import gc
 
-def date_to_calendar_week(date_obj):
-    """Converts a date object to a calendar week string (YYCWXX)."""
-    if pd.isna(date_obj):
-        return None
-    year, week, _ = date_obj.isocalendar()
-    return f"{year % 100:02d}CW{week:02d}"
+# Make the shared helpers in the repository root importable when run as a script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.cache import cache_path, load_cache, map_files_cached, save_cache
+from common.columnar import concat_frames, load_frames, save_frames
+from common.history import record_and_diff
+from common.instrument import abort_run, finish_run, record_file, stage, start_run
+from common.ma_extract import aggregate_demand, open_demand_chunks
+from common.options import DEFAULT_OPTIONS, add_run_arguments, options_from_args
+from common.report import MA_REPORT, build_grid, report_current_week, write_report
+from common.sniff import MA, select_files
+from common.watch import watch_directory
+from common.xlsx_stream import DEFAULT_CHUNK_SIZE
 
 def get_current_calendar_week():
     """Gets the current calendar week in YYCWXX format."""
-    now = datetime.now()
-    return date_to_calendar_week(now)
+    return report_current_week(MA_REPORT)
 
-def extract_data_from_excel(input_file):
+def extract_data_from_excel(input_file, chunk_size=DEFAULT_CHUNK_SIZE, source=None):
     """
     Extracts data, combines rows with same customer item and calendar week, sums quantities.
+    The sheet is streamed in read-only mode in chunks of chunk_size rows holding only the three
+    columns needed; each chunk is folded into a running (item, week) -> quantity total, so
+    memory grows with the number of distinct keys rather than the number of rows.
+    Returns a demand frame (see common.columnar) sorted by customer item and week ordinal, or
+    None if the file could not be read.
+    source is an optional file-like object holding the content of input_file (e.g. a read-ahead
+    buffer); input_file is then only used in messages.
     Handles potential issues with open files and forces file closure.
     """
     try:
         with warnings.catch_warnings(record=True) as w:
             warnings.simplefilter("ignore", category=UserWarning)
             try:
-                # Use a context manager to ensure the file is closed
-                with pd.ExcelFile(input_file, engine="openpyxl") as xlsx:
-                    df = pd.read_excel(xlsx, header=0)
+                # The streaming reader closes the file once the last chunk has been read
+                chunks = open_demand_chunks(input_file if source is None else source, chunk_size=chunk_size)
+            except KeyError:
+                print(f"Warning: Required columns not found in '{input_file}'.")
+                return None
             except InvalidFileException:
                 print(f"Warning: Could not open file '{input_file}'. It might be corrupted or not a valid Excel file.")
                 return None
             except Exception as e:
                 print(f"Warning: An error occurred while opening '{input_file}': {e}")
                 return None
+
+            # Group each chunk by Customer Item and Calendar Week and add it to the running totals
+            demand = aggregate_demand(chunks)
             
             for warning in w:
                 if "Workbook contains no default style" not in str(warning.message):
                     print(f"Warning in file {input_file}: {warning.message}")
 
-        # Find relevant columns (handle KeyError)
-        try:
-            customer_item_col = df.columns.get_loc("Customer Item")
-            quantity_col = df.columns.get_loc("Quantity")
-            planned_receipt_date_col = df.columns.get_loc("Planned Receipt Date")
-        except KeyError:
-            print(f"Warning: Required columns not found in '{input_file}'.")
-            return None
-
-        # Data cleaning and conversion
-        df["Planned Receipt Date"] = pd.to_datetime(df["Planned Receipt Date"])
-        df["Calendar Week"] = df["Planned Receipt Date"].apply(date_to_calendar_week)
-        df = df.dropna(subset=["Customer Item", "Quantity", "Calendar Week"])
-
-        # Group by Customer Item and Calendar Week, sum quantities
-        grouped = df.groupby(["Customer Item", "Calendar Week"])["Quantity"].sum().reset_index()
-
-        # Prepare data for output
-        extracted_data = []
-        for index, row in grouped.iterrows():
-            item_data = {
-                "customer_item": row["Customer Item"],
-                "calendar_week": row["Calendar Week"],
-                "quantity": int(row["Quantity"]),
-            }
-            extracted_data.append(item_data)
-        
-        # Explicitly delete the DataFrame and run garbage collection
-        del df
-        gc.collect()
-
-        return extracted_data
+        return demand
 
     except Exception as e:
         print(f"Warning: An unexpected error occurred while processing '{input_file}': {e}")
         return None
 
-def generate_calendar_weeks(start_week, end_week):
-    """Generates a list of calendar weeks between start_week and end_week (inclusive)."""
-    start_year = int(start_week[:2])
-    start_week_num = int(start_week[4:])
-    end_year = int(end_week[:2])
-    end_week_num = int(end_week[4:])
-
-    calendar_weeks = []
-    current_year = start_year
-    current_week_num = start_week_num
-
-    while True:
-        calendar_weeks.append(f"{current_year:02d}CW{current_week_num:02d}")
-        if current_year == end_year and current_week_num == end_week_num:
-            break
-        current_week_num += 1
-        if current_week_num > 53:
-            current_week_num = 1
-            current_year += 1
-            if current_year > 99:
-                current_year = 0
-    return calendar_weeks
-
-def post_process_calendar_weeks(data_list):
-    """Inserts missing calendar weeks into the data, filling with 0 quantities."""
-    if not data_list:
-        return []
-
-    # Create a DataFrame for easier manipulation
-    df = pd.DataFrame(data_list)
-
-    # Get unique customer items and calendar weeks
-    customer_items = df["customer_item"].unique()
-    calendar_weeks = df["calendar_week"].unique()
-
-    # Sort calendar weeks
-    calendar_weeks.sort()
-
-    # Determine the full range of calendar weeks
-    start_week = calendar_weeks[0]
-    end_week = calendar_weeks[-1]
-    all_calendar_weeks = generate_calendar_weeks(start_week, end_week)
-
-    # Create a new DataFrame with all calendar weeks
-    all_data = []
-    for item in customer_items:
-        for week in all_calendar_weeks:
-            quantity = df[(df["customer_item"] == item) & (df["calendar_week"] == week)]["quantity"].iloc[0] if (df[(df["customer_item"] == item) & (df["calendar_week"] == week)]["quantity"].any()) else 0
-            all_data.append({"customer_item": item, "calendar_week": week, "quantity": quantity})
-
-    return all_data
+def post_process_calendar_weeks(demand):
+    """
+    Builds the complete customer item x calendar week grid in one pass, inserting missing
+    calendar weeks with 0 quantities. Takes the combined demand frame of all files and returns
+    a DataFrame indexed by customer item (sorted) with one column per calendar week.
+    """
+    return build_grid(demand, MA_REPORT)
 
-def create_output_excel(data_list, output_file):
+def create_output_excel(grid, output_file, write_only=False, formats=("xlsx",), changed_cells=None):
     """
     Creates a formatted Excel file with a pivot table-like structure, showing all calendar weeks,
     freezes the first column and first row, and highlights the current calendar week cell in yellow.
+    Takes the customer item x calendar week grid built by post_process_calendar_weeks.
+    With write_only the rows are streamed through a write-only workbook to keep memory flat.
+    formats selects the outputs written from the grid ("xlsx", "csv", "parquet"); returns their paths.
+    changed_cells ({(customer item, calendar week)}) are highlighted in orange.
     """
-    if not data_list:
+    if grid is None or grid.empty:
         print("No data to create output Excel file.")
-        return
-
-    # Get all unique customer items and calendar weeks
-    customer_items = sorted(list(set([item["customer_item"] for item in data_list])))
-    all_calendar_weeks = sorted(list(set([item["calendar_week"] for item in data_list])))
-
-    # Get the current calendar week
-    current_cw = get_current_calendar_week()
-
-    # Create a new workbook
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Extracted Data"
-
-    # Define styles
-    header_font = Font(bold=True)
-    header_fill = PatternFill(start_color="D3D3D3", end_color="D3D3D3", fill_type="solid")
-    yellow_fill = PatternFill(start_color="FFFF00", end_color="FFFF00", fill_type="solid")  # Yellow fill
-
-    # Create header row
-    header_row = ["Customer Item"] + all_calendar_weeks
-    ws.append(header_row)
-    for cell in ws[1]:
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = Alignment(horizontal='center')
-
-    # Highlight the current calendar week cell in yellow
-    try:
-        current_cw_col_index = all_calendar_weeks.index(current_cw) + 2  # +2 to account for "Customer Item" column and 0-based index
-        ws.cell(row=1, column=current_cw_col_index).fill = yellow_fill
-    except ValueError:
-        pass  # Current calendar week not found in the data
-
-    # Create data rows
-    for customer_item in customer_items:
-        row_data = [customer_item]
-        for cw in all_calendar_weeks:
-            # Find the quantity for this customer item and calendar week, or default to 0
-            quantity = next((item["quantity"] for item in data_list if item["customer_item"] == customer_item and item["calendar_week"] == cw), 0)
-            row_data.append(quantity)
-        ws.append(row_data)
-
-    # Freeze the first row and first column
-    ws.freeze_panes = "B2"  # Freeze panes at cell B2
-
-    # Auto-adjust column widths
-    for col in ws.columns:
-        max_length = 0
-        column = col[0].column_letter
-        for cell in col:
-            if cell.value:
-                max_length = max(max_length, len(str(cell.value)))
-        adjusted_width = (max_length + 2)
-        ws.column_dimensions[column].width = adjusted_width
-
-    # Save the workbook
-    wb.save(output_file)
+        return []
+    paths, _ = write_report(grid, output_file, MA_REPORT, formats, write_only=write_only, changed_cells=changed_cells)
+    return paths
 
-def process_all_excel_files():
+def process_file(file_path, source=None):
     """
-    Processes all Excel files in the current directory and generates a consolidated output file.
+    Announces and extracts a single input file, from its read-ahead buffer source if given;
+    runs in a worker process in parallel mode.
     """
-    # Use the current directory as both input and output location
-    current_dir = os.path.dirname(os.path.abspath(__file__))
+    print(f"Processing file: {os.path.basename(file_path)}")
+    return extract_data_from_excel(file_path, source=source)
 
-    # Generate a timestamp for the output filename (YYYYMMDD_HHMM)
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M")
-    output_file = os.path.join(current_dir, f"extracted_data_{timestamp}.xlsx")
+def is_input_file(filename):
+    """Tells whether a file of the MA folder is an Excel input file rather than an output file."""
+    return (filename.endswith('.xlsx') or filename.endswith('.xls')) and not filename.startswith('extracted_data_')
 
-    all_data = []
-    processed_files = []
+def extract_files(file_paths, options=DEFAULT_OPTIONS, cache=None):
+    """
+    Extracts the given files as set by options (see common.options.RunOptions), reusing the
+    entries of unchanged files in cache. Files that are sniffed as another format (see
+    common.sniff) are skipped without parsing. Returns {file path: demand frame} of the files
+    that could be read, in file order; unreadable files are reported and left out.
+    """
+    results = {}
+    with stage("sniff", rows=len(file_paths)):
+        file_paths, skipped = select_files(file_paths, MA)
+    for file_path, detected in skipped.items():
+        print(f"Skipping '{os.path.basename(file_path)}': not an MA call-off export (detected: {detected}).")
+        record_file(file_path, rows=0, ok=False, skipped=detected)
+    for file_path, file_data in map_files_cached(process_file, file_paths, options.workers, cache,
+                                                 read_ahead=options.read_ahead, read_ahead_bytes=options.read_ahead_bytes):
+        file = os.path.basename(file_path)
+        if file_data is not None:
+            results[file_path] = file_data
+            record_file(file_path, rows=len(file_data), ok=True)
+        else:
+            print(f"Warning: File '{file}' was skipped due to an error.")
+            record_file(file_path, rows=0, ok=False)
+    return results
 
+def extract_all_files(current_dir, options=DEFAULT_OPTIONS):
+    """
+    Extracts every Excel input file of current_dir (excluding output files) into one demand
+    frame, with the workers, cache and read-ahead settings of options. Returns (demand, processed file names), or (None, []) if there are no input files.
+    """
     # Get all Excel files in the current directory, excluding output files
-    excel_files = [f for f in os.listdir(current_dir)
-                   if (f.endswith('.xlsx') or f.endswith('.xls'))
-                   and not f.startswith('extracted_data_')]
+    excel_files = [f for f in os.listdir(current_dir) if is_input_file(f)]
 
     if not excel_files:
         print("No Excel files found in the current directory.")
-        return
+        return None, []
 
     print(f"Found {len(excel_files)} Excel files to process.")
 
     # Process each file
-    files_with_data = 0
-    for file in excel_files:
-        file_path = os.path.join(current_dir, file)
-        print(f"Processing file: {file}")
-        file_data = extract_data_from_excel(file_path)
-
-        if file_data is not None:
-            files_with_data += 1
-            all_data.extend(file_data)
-            processed_files.append(file)
-        else:
-            print(f"Warning: File '{file}' was skipped due to an error.")
+    cache_file = cache_path("ma_extraction", current_dir)
+    cache = load_cache(cache_file) if options.use_cache else None
+    file_paths = [os.path.join(current_dir, file) for file in excel_files]
+    with stage("extract") as extract_stage:
+        results = extract_files(file_paths, options, cache)
+        if cache is not None:
+            save_cache(cache, cache_file)
+        demand = concat_frames(results.values())
+        extract_stage["rows"] = len(demand)
+    return demand, [os.path.basename(file_path) for file_path in results]
+
+def generate_report(demand, output_file, options=DEFAULT_OPTIONS):
+    """
+    Builds the gap-filled grid from the combined demand frame and writes the report outputs
+    in options.formats. With options.history_file the run is appended to that history
+    database; options.highlight_deltas then marks the cells that changed since the previous run.
+    """
+    changed_cells = None
+    if options.history_file:
+        with stage("history"):
+            changed_cells = record_and_diff(options.history_file, "MA", output_file, demand,
+                                            highlight=options.highlight_deltas)
 
     # --- INSERTION POINT ---
-    # Post-processing step: Insert missing calendar weeks
-    if all_data:  # Only post-process if there's data
-        all_data = post_process_calendar_weeks(all_data)
+    # Post-processing step: Build the item x week grid with missing calendar weeks
+    with stage("gap_fill") as gap_fill_stage:
+        grid = post_process_calendar_weeks(demand)
+        gap_fill_stage["rows"] = int(grid.size)
     # --- END INSERTION POINT ---
 
     # Create the output file
-    if all_data:
-        create_output_excel(all_data, output_file)
-        print(f"Output saved to: {output_file}")
+    if not grid.empty:
+        with stage("pivot_write", rows=int(grid.size)):
+            output_paths = create_output_excel(grid, output_file, write_only=options.write_only, formats=options.formats,
+                                               changed_cells=changed_cells)
+        for path in output_paths:
+            print(f"Output saved to: {path}")
     else:
         print("No data was extracted from the Excel files.")
+
+def default_output_file(current_dir):
+    """Returns the timestamped output file (YYYYMMDD_HHMM) in current_dir."""
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M")
+    return os.path.join(current_dir, f"extracted_data_{timestamp}.xlsx")
+
+def process_all_excel_files(options=DEFAULT_OPTIONS, input_dir=None, output_file=None):
+    """
+    Processes all Excel files in input_dir (default: the script's directory) and generates a
+    consolidated output file (default: a timestamped file in input_dir), as set by options
+    (see common.options.RunOptions).
+    A JSON run report with per-stage and per-file timings is written next to the output file.
+    Returns the run report, or None if there was nothing to process.
+    """
+    # Use the script's directory as both input and output location by default
+    current_dir = input_dir or os.path.dirname(os.path.abspath(__file__))
+    output_file = output_file or default_output_file(current_dir)
+
+    start_run("MA", profile=options.profile)
+    if options.from_intermediate:
+        with stage("load_intermediate") as load_stage:
+            demand = load_frames(options.from_intermediate, ["demand"])["demand"]
+            load_stage["rows"] = len(demand)
+        print(f"Loaded intermediate data of: {options.from_intermediate}")
+        processed_files = []
+    else:
+        demand, processed_files = extract_all_files(current_dir, options)
+        if demand is None:
+            abort_run()
+            return None
+        if options.save_intermediate:
+            for path in save_frames({"demand": demand}, output_file, options.save_intermediate):
+                print(f"Intermediate data saved to: {path}")
+
+    generate_report(demand, output_file, options)
+    report = finish_run(output_file)
     
+    if options.from_intermediate:
+        return report
     if processed_files:
         print("\nFiles processed successfully:")
         for file in processed_files:
             print(f"- {file}")
     else:
         print("\nNo files were processed successfully.")
+    return report
+
+def watch_excel_files(options=DEFAULT_OPTIONS):
+    """
+    Keeps watching the script's directory and regenerates the report whenever input files are
+    added, changed or removed. Only the changed files are re-extracted; the report is rebuilt
+    from the demand frames kept in memory. Each refresh writes a new timestamped output file
+    and run report. The folder is polled every options.interval seconds and a refresh waits
+    until it has been quiet for options.debounce seconds.
+    """
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    cache_file = cache_path("ma_extraction", current_dir)
+    cache = load_cache(cache_file) if options.use_cache else None
+    results = {}
+
+    def refresh(changed, removed):
+        for file_path in removed:
+            print(f"Removed: {os.path.basename(file_path)}")
+            results.pop(file_path, None)
+        output_file = default_output_file(current_dir)
+        start_run("MA")
+        with stage("extract") as extract_stage:
+            for file_path in changed:
+                # A file that now fails to extract must not keep its old data
+                results.pop(file_path, None)
+            results.update(extract_files(changed, options, cache))
+            if cache is not None:
+                save_cache(cache, cache_file)
+            demand = concat_frames(results.values())
+            extract_stage["rows"] = len(demand)
+        generate_report(demand, output_file, options)
+        finish_run(output_file)
+
+    watch_directory(current_dir, is_input_file, refresh, interval=options.interval, debounce=options.debounce)
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Consolidates MA call-off Excel files into one pivot workbook.")
+    add_run_arguments(parser)
+    args = parser.parse_args()
+    if args.highlight_deltas and not args.history:
+        parser.error("--highlight-deltas needs --history")
+    options = options_from_args(args)
+
     print("Excel Data Extraction Tool")
     print("=" * 30)
     print("This script will process all Excel files in its directory.")
     print("The output will be saved in the same directory.")
     print("=" * 30)
 
-    # Process all files in the current directory
-    process_all_excel_files()
+    if args.watch:
+        # Runs until interrupted, so there is no console window to keep open
+        watch_excel_files(options)
+    else:
+        # Process all files in the current directory
+        process_all_excel_files(options)
 
-    # Keep console window open until user presses Enter
-    input("\nPress Enter to exit...")
+        # Keep console window open until user presses Enter
+        input("\nPress Enter to exit...")
@@ -1,282 +1,319 @@
-import pandas as pd
 import os
-from openpyxl import Workbook, load_workbook
-from openpyxl.styles import Font, Alignment, PatternFill
-import re
-from datetime import datetime, date
+import sys
+import argparse
+from functools import partial
+from openpyxl import load_workbook
+from datetime import datetime
 import zipfile
 
+# Make the shared helpers in the repository root importable when run as a script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.calendar_weeks import MB_FORMAT
+from common.cache import cache_path, load_cache, map_files_cached, save_cache
+from common.columnar import abs_frame, concat_frames, load_frames, ruckstand_frame, save_frames
+from common.edi import (DEFAULT_EDI_LAYOUT, EDI_SHEET, apply_edi_plan, build_edi_index, has_changes, load_edi_index,
+                        load_edi_layout, plan_edi_update, save_edi_index)
+from common.history import record_and_diff
+from common.instrument import finish_run, record_file, stage, start_run
+from common.mb_extract import DEFAULT_HORIZON, MAX_HORIZON, extract_mb_workbook
+from common.options import DEFAULT_OPTIONS, add_run_arguments, options_from_args
+from common.outputs import write_abs_extract
+from common.report import MB_REPORT, build_grid, report_current_week, write_report
+from common.sniff import MB, select_files
+from common.watch import watch_directory
+
+DEFAULT_MERCEDES_FILE = "Mercedes_Shipping_Plan_EDI.xlsx"
+
 def get_current_calendar_week():
     """Calculates the current calendar week in the format 'WW/YYYY'."""
-    now = date.today()
-    year, week, _ = now.isocalendar()
-    return f"{week:02d}/{year}"
+    return report_current_week(MB_REPORT)
 
-def process_mb_files(input_dir, output_file, mercedes_file):
-    """Processes MB files, extracts data, and updates the Mercedes file."""
-    all_data = []
-    all_data_bedarfs = []
-    all_data_ruckstand = []
-    print(f"Processing files in directory: {input_dir}")  # Add this line
-    for filename in os.listdir(input_dir):
-        print(f"Checking file: {filename}")  # Add this line
-        if filename.endswith(('.xls', '.xlsx')) and not filename.startswith(("mb_extracted_data_", "~$")) and filename != os.path.basename(mercedes_file):
-            print(f"Processing file: {filename}")  # Add this line
-            filepath = os.path.join(input_dir, filename)
-            try:
-                df = pd.read_excel(filepath, sheet_name="Zeitraum bis Bedarfsende", header=None)
-                customer_item_raw = df.iloc[1, 0]
-                match = re.search(r"Sachnummer:\s+(\S+)", customer_item_raw)
-                customer_item = match.group(1) if match else None
-                if customer_item is None:
-                    print(f"Warning: Could not extract Customer Item from {filename}")
-                    continue
-                print(f"Sachnummer found: {customer_item}")
+def extract_mb_file(filepath, current_week=None, source=None, horizon=DEFAULT_HORIZON):
+    """
+    Extracts the Bedarf, ABS and Rückstand frames from a single MB file (see
+    common.mb_extract.extract_mb_workbook), printing its progress. current_week defaults to
+    get_current_calendar_week(); the ABS window covers horizon weeks from it. source is an
+    optional read-ahead buffer with the content of filepath. Runs in a worker process in
+    parallel mode.
+    """
+    if current_week is None:
+        current_week = get_current_calendar_week()
+    filename = os.path.basename(filepath)
+    print(f"Processing file: {filename}")  # Add this line
+    return extract_mb_workbook(filepath if source is None else source, current_week, name=filename, log=print,
+                               horizon=horizon)
 
-                # Extract calendar weeks from row 6 (index 5)
-                calendar_weeks = df.iloc[5, 1:].tolist()
+def process_mb_files(input_dir, output_file, mercedes_file, options=DEFAULT_OPTIONS):
+    """
+    Processes MB files, extracts data, and updates the Mercedes file, as set by options (see
+    common.options.RunOptions).
+    A JSON run report with per-stage and per-file timings is written next to the output file.
+    Returns the run report.
+    """
+    start_run("MB", profile=options.profile)
+    if options.from_intermediate:
+        with stage("load_intermediate") as load_stage:
+            frames = load_frames(options.from_intermediate, ["bedarfs", "abs", "ruckstand"])
+            load_stage["rows"] = len(frames["bedarfs"]) + len(frames["abs"])
+        print(f"Loaded intermediate data of: {options.from_intermediate}")
+        all_data_bedarfs, all_data, all_data_ruckstand = frames["bedarfs"], frames["abs"], frames["ruckstand"]
+    else:
+        all_data_bedarfs, all_data, all_data_ruckstand = extract_mb_files(input_dir, mercedes_file, options)
+        if options.save_intermediate:
+            frames = {"bedarfs": all_data_bedarfs, "abs": all_data, "ruckstand": all_data_ruckstand}
+            for path in save_frames(frames, output_file, options.save_intermediate):
+                print(f"Intermediate data saved to: {path}")
 
-                # Extract data for Bedarf
-                quantities_bedarf = df.iloc[7, 1:].tolist()
-                temp_data_bedarf = []
-                for cw, qty in zip(calendar_weeks, quantities_bedarf):
-                    if pd.notna(cw) and pd.notna(qty):
-                        temp_data_bedarf.append({"customer_item": customer_item, "calendar_week": cw, "quantity": int(qty)})
-                temp_data_bedarf.sort(key=lambda x: (int(x['calendar_week'].split('/')[1]), int(x['calendar_week'].split('/')[0])))
-                all_data_bedarfs.extend(temp_data_bedarf)
+    generate_reports(all_data_bedarfs, all_data, all_data_ruckstand, output_file, mercedes_file, options)
+    return finish_run(output_file)
 
-                # Find rows with "ABS" followed by a number
-                abs_rows = []
-                for index, row in df.iterrows():
-                    first_cell_value = row.iloc[0]
-                    if isinstance(first_cell_value, str) and re.match(r"^\s*ABS\s+\d+\w*", first_cell_value):
-                        abs_rows.append(index)
-                if abs_rows:
-                    print(f"ABS rows found in {filename}")
-                else:
-                    print(f"No ABS rows found in {filename}")
+def generate_reports(all_data_bedarfs, all_data, all_data_ruckstand, output_file, mercedes_file, options=DEFAULT_OPTIONS):
+    """
+    Updates the Mercedes file (with options.edi_layout) and writes the ABS extract and the
+    Bedarf pivot in options.formats from the combined frames.
+    With options.history_file the run is appended to that history database;
+    options.highlight_deltas then marks the Bedarf cells that changed since the previous run.
+    """
+    changed_cells = None
+    if options.history_file:
+        with stage("history"):
+            changed_cells = record_and_diff(options.history_file, "MB", output_file, all_data_bedarfs, all_data,
+                                            all_data_ruckstand, highlight=options.highlight_deltas)
+    if not all_data.empty:
+        with stage("mercedes_update", rows=len(all_data)):
+            update_mercedes_file(all_data, all_data_ruckstand, mercedes_file, options.edi_layout)
+    if not all_data_ruckstand.empty:
+        for path in write_abs_extract(all_data, all_data_ruckstand, output_file, MB_FORMAT, options.formats):
+            print(f"ABS extract saved to: {path}")
+    if not all_data_bedarfs.empty:
+        with stage("pivot_write", rows=len(all_data_bedarfs)):
+            output_paths = create_output_excel(all_data_bedarfs, output_file, write_only=options.write_only,
+                                               formats=options.formats, changed_cells=changed_cells)
+        for path in output_paths:
+            print(f"Output saved to: {path}")
+    else:
+        print("No data found.")
+
+def is_mb_input_file(filename, mercedes_file):
+    """Tells whether a file of the MB folder is an MB input rather than an output, lock or Mercedes file."""
+    return (filename.endswith(('.xls', '.xlsx')) and not filename.startswith(("mb_extracted_data_", "~$"))
+            and filename != os.path.basename(mercedes_file))
+
+def extract_files(filepaths, current_week, options=DEFAULT_OPTIONS, cache=None):
+    """
+    Extracts the given MB files for the ABS window starting at current_week, as set by options
+    (see common.options.RunOptions), reusing the entries of unchanged files in cache. Files that
+    are sniffed as another format (see common.sniff) are skipped without parsing. Returns
+    {file path: result} of the files with a Sachnummer, in file order.
+    """
+    results = {}
+    with stage("sniff", rows=len(filepaths)):
+        filepaths, skipped = select_files(filepaths, MB)
+    for filepath, detected in skipped.items():
+        print(f"Skipping {os.path.basename(filepath)}: not an MB call-off (detected: {detected}).")
+        record_file(filepath, rows=0, ok=False, skipped=detected)
+    complete = lambda result: result is not None and "error" not in result
+    extract = partial(extract_mb_file, current_week=current_week, horizon=options.horizon)
+    # The cached ABS windows depend on both the start week and the horizon
+    context = (current_week, options.horizon)
+    for filepath, result in map_files_cached(extract, filepaths, options.workers, cache, cacheable=complete, context=context,
+                                             read_ahead=options.read_ahead, read_ahead_bytes=options.read_ahead_bytes):
+        if result is None:
+            record_file(filepath, rows=0, ok=False)
+            continue
+        results[filepath] = result
+        record_file(filepath, rows=len(result["bedarfs"]) + len(result["abs_data"]), ok="error" not in result)
+    return results
 
-                # Extract data for each ABS row
-                for row_index in abs_rows:
-                    abs_value_raw = df.iloc[row_index, 0].strip()
-                    if isinstance(abs_value_raw, str) and abs_value_raw.startswith("ABS "):
-                        abs_value = abs_value_raw.split(" ", 1)[1]
-                    else:
-                        abs_value = abs_value_raw
-                    quantities = df.iloc[row_index, 1:].tolist()
+def combine_results(results):
+    """Concatenates per-file extraction results into the (bedarfs, abs, ruckstand) frames."""
+    return (concat_frames(result["bedarfs"] for result in results),
+            concat_frames((result["abs_data"] for result in results), empty=abs_frame),
+            concat_frames((result["ruckstand"] for result in results), empty=ruckstand_frame))
 
-                    # Get current week index
-                    current_week = get_current_calendar_week()
-                    try:
-                        current_week_index = calendar_weeks.index(current_week)
-                    except ValueError:
-                        print(f"Warning: Current week {current_week} not found in {filename}")
-                        continue
+def extract_mb_files(input_dir, mercedes_file, options=DEFAULT_OPTIONS):
+    """
+    Extracts every MB file of input_dir (excluding output files and the Mercedes file) for an
+    ABS window of options.horizon weeks.
+    Returns the combined (bedarfs, abs, ruckstand) frames.
+    """
+    print(f"Processing files in directory: {input_dir}")  # Add this line
+    filepaths = []
+    for filename in os.listdir(input_dir):
+        print(f"Checking file: {filename}")  # Add this line
+        if is_mb_input_file(filename, mercedes_file):
+            filepaths.append(os.path.join(input_dir, filename))
 
-                    # Extract the 5 data points
-                    extracted_quantities = quantities[current_week_index:current_week_index + 5]
+    # The ABS window starts at the current week, so it is computed once and keys the cache
+    current_week = get_current_calendar_week()
+    cache_file = cache_path("mb_extraction", input_dir)
+    cache = load_cache(cache_file) if options.use_cache else None
+    with stage("extract") as extract_stage:
+        results = extract_files(filepaths, current_week, options, cache)
+        if cache is not None:
+            save_cache(cache, cache_file)
+        all_data_bedarfs, all_data, all_data_ruckstand = combine_results(results.values())
+        extract_stage["rows"] = len(all_data_bedarfs) + len(all_data)
+    return all_data_bedarfs, all_data, all_data_ruckstand
 
-                    # Ensure we have 5 data points, fill with None if not enough
-                    while len(extracted_quantities) < 5:
-                        extracted_quantities.append(None)
+def watch_mb_files(input_dir, mercedes_file, options=DEFAULT_OPTIONS):
+    """
+    Keeps watching input_dir and regenerates the Bedarf report and the Mercedes update whenever
+    MB files are added, changed or removed. Only the changed files are re-extracted (all of them
+    once the calendar week rolls over, since the ABS window moves); the reports are rebuilt from
+    the results kept in memory. Each refresh writes a new timestamped output file and run report.
+    The folder is polled every options.interval seconds and a refresh waits until it has been
+    quiet for options.debounce seconds.
+    """
+    cache_file = cache_path("mb_extraction", input_dir)
+    cache = load_cache(cache_file) if options.use_cache else None
+    results = {}
+    state = {"current_week": None}
 
-                    all_data.append({
-                        "customer_item": customer_item,
-                        "abs_value": abs_value,
-                        "quantities": extracted_quantities,
-                        "calendar_weeks": [calendar_weeks[i] if i < len(calendar_weeks) else None for i in range(current_week_index, current_week_index + 5)]
-                    })
-                # Extract data for Rückstand
-                df_bkm = pd.read_excel(filepath, sheet_name="BKM Lieferbeziehung", header=None)
-                for row_index in abs_rows:
-                    abs_value_raw = df.iloc[row_index, 0].strip()
-                    if isinstance(abs_value_raw, str) and abs_value_raw.startswith("ABS "):
-                        abs_value = abs_value_raw.split(" ", 1)[1]
-                    else:
-                        abs_value = abs_value_raw
-                    ruckstand = df_bkm.iloc[row_index, 21]
-                    all_data_ruckstand.append({
-                        "customer_item": customer_item,
-                        "abs_value": abs_value,
-                        "ruckstand":ruckstand
-                    })
+    def refresh(changed, removed):
+        for filepath in removed:
+            print(f"Removed: {os.path.basename(filepath)}")
+            results.pop(filepath, None)
+        current_week = get_current_calendar_week()
+        if current_week != state["current_week"]:
+            changed = list(dict.fromkeys(list(results) + changed))
+            state["current_week"] = current_week
+        output_file = default_output_file()
+        start_run("MB")
+        with stage("extract") as extract_stage:
+            for filepath in changed:
+                # A file that now fails to extract must not keep its old data
+                results.pop(filepath, None)
+            results.update(extract_files(changed, current_week, options, cache))
+            if cache is not None:
+                save_cache(cache, cache_file)
+            all_data_bedarfs, all_data, all_data_ruckstand = combine_results(results.values())
+            extract_stage["rows"] = len(all_data_bedarfs) + len(all_data)
+        generate_reports(all_data_bedarfs, all_data, all_data_ruckstand, output_file, mercedes_file, options)
+        finish_run(output_file)
 
-            except Exception as e:
-                print(f"Error processing {filename}: {e}")
+    watch_directory(input_dir, lambda filename: is_mb_input_file(filename, mercedes_file), refresh,
+                    interval=options.interval, debounce=options.debounce)
 
-    if all_data:
-        update_mercedes_file(all_data, all_data_ruckstand, mercedes_file)
-    if all_data_bedarfs:
-        create_output_excel(all_data_bedarfs, output_file)
-        print(f"Output saved to: {output_file}")
+def report_mercedes_error(e, mercedes_file, action="access"):
+    """Prints the message for an error raised while opening or saving the Mercedes file."""
+    if isinstance(e, FileNotFoundError):
+        print(f"Error: Mercedes file '{mercedes_file}' not found.")
+    elif isinstance(e, KeyError):
+        print(f"Error: Sheet 'EDI' not found in '{mercedes_file}'.")
+    elif isinstance(e, PermissionError):
+        print(f"Error: Permission denied to {action} '{mercedes_file}'. Is the file open in another program?")
+    elif isinstance(e, zipfile.BadZipFile):
+        print(f"Error: '{mercedes_file}' is corrupted or not a valid Excel file.")
+    elif action == "save":
+        print(f"Error saving Mercedes file: {e}")
     else:
-        print("No data found.")
+        print(f"Error loading Mercedes file: {e}")
 
-def update_mercedes_file(data_list, data_list_ruckstand, mercedes_file):
+def print_mercedes_summary(summary):
+    print(f"Mercedes update: {summary['rows_added']} new rows, {summary['rows_changed']} rows changed, "
+          f"{summary['cells_changed']} cells changed, {summary['header_cells_changed']} week headers changed.")
+
+def update_mercedes_file(data_list, data_list_ruckstand, mercedes_file, layout=DEFAULT_EDI_LAYOUT):
+    """
+    Updates the "EDI" sheet of the Mercedes file with the ABS quantities and Rückstand
+    (the abs and ruckstand frames, see common.columnar), placing the ABS window weeks in the
+    quantity columns of layout (see common.edi.EdiLayout).
+    The (Sachnummer, ABS) row index of the sheet is taken from the index cache (or streamed
+    once in read-only mode) and the changes are planned against it by common.edi.plan_edi_update;
+    if nothing would change, the full workbook is neither loaded nor saved. Otherwise the
+    planned changes are written into the sheet (unknown keys get a new yellow row, cells are
+    only written when their value changes), the file is saved and the index cache refreshed.
+    Returns a summary dict of the changes.
+    """
     if not os.path.exists(mercedes_file):
         print(f"Error: Mercedes file '{mercedes_file}' not found.")
         return
     print(f"Mercedes file exists: {mercedes_file}")
     try:
-        wb = load_workbook(mercedes_file)
-        print(f"Mercedes file loaded successfully: {mercedes_file}")
-        ws = wb["EDI"]  # Access the "EDI" sheet
-    except FileNotFoundError:
-        print(f"Error: Mercedes file '{mercedes_file}' not found.")
-        return
-    except KeyError:
-        print(f"Error: Sheet 'EDI' not found in '{mercedes_file}'.")
-        return
-    except PermissionError:
-        print(f"Error: Permission denied to access '{mercedes_file}'. Is the file open in another program?")
-        return
-    except zipfile.BadZipFile:
-        print(f"Error: '{mercedes_file}' is corrupted or not a valid Excel file.")
-        return
+        with stage("mercedes_index"):
+            index, cached = load_edi_index(mercedes_file)
     except Exception as e:
-        print(f"Error loading Mercedes file: {e}")
+        report_mercedes_error(e, mercedes_file)
         return
+    if cached:
+        print(f"Using cached EDI index of: {os.path.basename(mercedes_file)}")
 
-    header_font = Font(bold=True)
-    yellow_fill = PatternFill(start_color="FFFF00", end_color="FFFF00", fill_type="solid")
-
-    # Create a dictionary to store existing data for faster lookup
-    existing_data = {}
-    for row in ws.iter_rows(min_row=2):
-        sachnummer = row[3].value
-        abs_value_raw = row[6].value
-        if sachnummer and abs_value_raw:
-            if isinstance(abs_value_raw, str) and abs_value_raw.startswith("ABS "):
-                abs_value = abs_value_raw.split(" ", 1)[1]
-                row[6].value = abs_value
-            else:
-                abs_value = abs_value_raw
-            existing_data[(sachnummer, str(abs_value))] = row
-    
-    # Create a dictionary for faster lookup of Rückstand
-    ruckstand_data = {}
-    for item in data_list_ruckstand:
-        ruckstand_data[(item["customer_item"], item["abs_value"])] = item["ruckstand"]
+    plan = plan_edi_update(index, data_list, data_list_ruckstand, layout)
+    summary = plan["summary"]
+    if not has_changes(summary):
+        print_mercedes_summary(summary)
+        print("Mercedes file is already up to date; not saving.")
+        return summary
 
-    for data in data_list:
-        sachnummer = data["customer_item"]
-        abs_value = data["abs_value"]
-        quantities = data["quantities"]
-        calendar_weeks = data["calendar_weeks"]
-
-        # Find the row or create a new one
-        match_key = (sachnummer, str(abs_value))
-        if match_key in existing_data:
-            row = existing_data[match_key]
-        else:
-            # Add a new row
-            new_row = [None] * ws.max_column
-            ws.append(new_row)
-            rows_list = list(ws.rows)
-            row = rows_list[-1]
-            row[3+10].value = sachnummer  # Sachnummer
-            row[6+9].value = abs_value  # ABS
-            # Highlight the new row in yellow
-            for cell in row:
-                cell.fill = yellow_fill
-        # Fill Rückstand
-        if match_key in ruckstand_data:
-            row[9+8].value = ruckstand_data[match_key]
-            
-        # # Clear existing data in the five columns before filling
-        # columns_to_clear = [11+8, 13+8, 15+8, 17+8, 19+8]  # S U W Y AA (Corrected indices)
-        # for col_index in columns_to_clear:
-        #     row[col_index-1].value = None
-            
-        # Fill in the quantities and calendar weeks
-        columns = [11+8, 13+8, 15+8, 17+8, 19+8]  # S U W Y AA (Corrected indices)
-        for i, (qty, cw) in enumerate(zip(quantities, calendar_weeks)):
-            if qty is not None:
-                row[columns[i]-1].value = qty
-            if cw is not None:
-                ws.cell(row=1, column=columns[i]).value = cw
     try:
-        wb.save(mercedes_file)
-    except PermissionError:
-        print(f"Error: Permission denied to save '{mercedes_file}'. Is the file open in another program?")
-        return
+        wb = load_workbook(mercedes_file)
+        print(f"Mercedes file loaded successfully: {mercedes_file}")
+        ws = wb[EDI_SHEET]  # Access the "EDI" sheet
     except Exception as e:
-        print(f"Error saving Mercedes file: {e}")
+        report_mercedes_error(e, mercedes_file)
         return
 
+    apply_edi_plan(ws, plan)
+    print_mercedes_summary(summary)
 
-def create_output_excel(data_list, output_file):
-    if not data_list:
+    try:
+        with stage("mercedes_save"):
+            wb.save(mercedes_file)
+    except Exception as e:
+        report_mercedes_error(e, mercedes_file, "save")
         return
+    # The saved sheet is still in memory, so the index of the new file needs no re-read
+    save_edi_index(mercedes_file, build_edi_index(ws.iter_rows(values_only=True)))
+    return summary
 
-    all_calendar_weeks = sorted(list(set([item["calendar_week"] for item in data_list])), key=lambda x: (int(x.split('/')[1]), int(x.split('/')[0])))
-
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Extracted Data"
-    header_font = Font(bold=True)
-    header_fill = PatternFill(start_color="D3D3D3", end_color="D3D3D3", fill_type="solid")
-    yellow_fill = PatternFill(start_color="FFFF00", end_color="FFFF00", fill_type="solid")  # Yellow fill
-
-    header_row = ["Customer Item"] + all_calendar_weeks
-    ws.append(header_row)
-    for cell in ws[1]:
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = Alignment(horizontal='center')
-
-    # Define the desired order
-    desired_order = [
-        "A2238305705",
-        "A2238305706",
-        "A2068305905",
-        "A2548302703",
-        "A2148308201",
-        "A2978306501",
-        "A2979970200",
-        "A2979970600",
-        "A0005003700",
-        "A0005003101",
-        "A0005004901",
-        "A0005005301",
-        "A0005002901",
-    ]
-
-    # Extract customer items and sort them based on the desired order or alphabetically
-    customer_items = sorted(list(set([item["customer_item"] for item in data_list])), key=lambda x: (desired_order.index(x) if x in desired_order else len(desired_order)))
-
-    for customer_item in customer_items:
-        row_data = [customer_item]
-        for cw in all_calendar_weeks:
-            quantity = next((item["quantity"] for item in data_list if item["customer_item"] == customer_item and item["calendar_week"] == cw), 0)
-            row_data.append(quantity)
-        ws.append(row_data)
-    ws.freeze_panes = "B2"
+def create_output_excel(data_list, output_file, write_only=False, formats=("xlsx",), changed_cells=None):
+    """
+    Writes the Bedarf pivot (customer items in desired_order x calendar weeks) from the combined
+    bedarfs frame. With write_only the rows are streamed through a write-only workbook to keep
+    memory flat. formats selects the outputs written from the pivot ("xlsx", "csv", "parquet");
+    returns their paths. changed_cells ({(customer item, calendar week)}) are highlighted in orange.
+    """
+    if data_list.empty:
+        return []
 
-    # Highlight current week
-    now = date.today()
-    year, week, _ = now.isocalendar()
-    current_week = f"{week:02d}/{year}"
-
-    try:
-        col_index = all_calendar_weeks.index(current_week) + 2
-        ws.cell(row=1, column=col_index).fill = yellow_fill
-    except ValueError:
+    # Pivot once, with the customer items sorted based on the desired order
+    grid = build_grid(data_list, MB_REPORT)
+    current_week = get_current_calendar_week()
+    paths, highlighted = write_report(grid, output_file, MB_REPORT, formats, write_only=write_only,
+                                      changed_cells=changed_cells, current_week=current_week)
+    if "xlsx" in formats and not highlighted:
         print(f"Warning: Current week {current_week} not found in data.")
+    return paths
 
-    for col in ws.columns:
-        max_length = 0
-        column = col[0].column_letter
-        for cell in col:
-            if cell.value:
-                max_length = max(max_length, len(str(cell.value)))
-        adjusted_width = (max_length + 2)
-        ws.column_dimensions[column].width = adjusted_width
-    wb.save(output_file)
+def default_output_file():
+    """Returns the timestamped output file (YYMMDD_HHMM), relative to the working directory."""
+    timestamp = datetime.now().strftime("%y%m%d_%H%M")
+    return f"mb_extracted_data_{timestamp}.xlsx"
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Extracts MB call-off data and updates the Mercedes shipping plan.")
+    add_run_arguments(parser, inputs="MB files", outputs="the report and the Mercedes update", cells="Bedarf cells",
+                      format_note="; csv and parquet also write the ABS/Rückstand extract")
+    parser.add_argument("--horizon", type=int, default=DEFAULT_HORIZON, help=f"Weeks of each ABS row copied to the Mercedes file, starting at the current week (default: {DEFAULT_HORIZON}, at most {MAX_HORIZON}).")
+    parser.add_argument("--edi-layout", metavar="JSON_FILE", help='Column layout of the Mercedes EDI sheet, e.g. {"first_quantity_column": "S", "column_step": 2} (the default).')
+    args = parser.parse_args()
+    if args.highlight_deltas and not args.history:
+        parser.error("--highlight-deltas needs --history")
+    if not 1 <= args.horizon <= MAX_HORIZON:
+        parser.error(f"--horizon must be between 1 and {MAX_HORIZON}")
+    edi_layout = DEFAULT_EDI_LAYOUT
+    if args.edi_layout:
+        try:
+            edi_layout = load_edi_layout(args.edi_layout)
+        except (OSError, ValueError, TypeError) as e:
+            parser.error(f"invalid EDI layout '{args.edi_layout}': {e}")
+    options = options_from_args(args, horizon=args.horizon, edi_layout=edi_layout)
+
     input_directory = os.path.dirname(os.path.abspath(__file__))
-    timestamp = datetime.now().strftime("%y%m%d_%H%M")
-    output_excel_file = f"mb_extracted_data_{timestamp}.xlsx"
-    mercedes_excel_file = "Mercedes_Shipping_Plan_EDI.xlsx"
-    process_mb_files(input_directory, output_excel_file, mercedes_excel_file)
+    mercedes_excel_file = DEFAULT_MERCEDES_FILE
+    if args.watch:
+        watch_mb_files(input_directory, mercedes_excel_file, options)
+    else:
+        output_excel_file = default_output_file()
+        process_mb_files(input_directory, output_excel_file, mercedes_excel_file, options)
@@ -0,0 +1,206 @@
+"""
+Runs many MA/MB jobs (one per plant or customer folder) from a manifest in a single process.
+
+All jobs share one pool of worker processes that import pandas, openpyxl and the extraction
+code once, and the run ends with one combined summary instead of a report per launch:
+
+    python batch.py nightly.json [--workers 8] [--summary nightly_summary.json]
+
+The manifest is JSON; relative paths are relative to the manifest's folder:
+
+    {
+        "workers": 4,
+        "summary": "nightly_summary.json",
+        "jobs": [
+            {"name": "plant-a", "format": "MA", "input_dir": "plants/a"},
+            {"name": "mercedes", "format": "MB", "input_dir": "mercedes",
+             "edi_file": "mercedes/Mercedes_Shipping_Plan_EDI.xlsx", "output": "reports/mercedes.xlsx",
+             "formats": ["xlsx", "csv"], "history": "mercedes/.mb_history.sqlite"}
+        ]
+    }
+
+Job keys: format ("MA" or "MB") and input_dir are required. Optional: name (default: the
+folder name), output (default: a timestamped file in input_dir), edi_file (MB only, default:
+Mercedes_Shipping_Plan_EDI.xlsx in input_dir), horizon and edi_layout (MB only), formats,
+history, highlight_deltas, write_only, use_cache, profile, read_ahead and read_ahead_memory
+(in MB), with the same meaning as the scripts' command line options.
+"""
+import argparse
+import contextlib
+import dataclasses
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+# Make the shared helpers and both scripts importable when run as a script
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from common.edi import DEFAULT_EDI_LAYOUT, load_edi_layout
+from common.mb_extract import DEFAULT_HORIZON, MAX_HORIZON
+from common.options import RunOptions
+from common.outputs import OUTPUT_FORMATS
+from common.parallel import shared_worker_pool
+from common.prefetch import DEFAULT_MAX_BYTES as DEFAULT_READ_AHEAD_BYTES, DEFAULT_READ_AHEAD
+from MA import ma_script
+from MB import mb_script
+
+JOB_FORMATS = ("MA", "MB")
+# Imported once by every worker process of the shared pool
+WARM_MODULES = ("MA.ma_script", "MB.mb_script")
+JOB_KEYS = {"name", "format", "input_dir", "output", "edi_file", "horizon", "edi_layout", "formats", "history",
+            "highlight_deltas", "write_only", "use_cache", "profile", "read_ahead", "read_ahead_memory"}
+MB_ONLY_KEYS = ("edi_file", "horizon", "edi_layout")
+
+def _resolve(base_dir, path):
+    return os.path.abspath(os.path.join(base_dir, path)) if path else None
+
+def load_manifest(path):
+    """
+    Reads and validates a manifest. Returns {"workers", "summary", "jobs"} with absolute paths
+    and the options of every job as a RunOptions; raises ValueError describing the first invalid
+    entry.
+    """
+    with open(path, encoding="utf-8") as f:
+        manifest = json.load(f)
+    base_dir = os.path.dirname(os.path.abspath(path))
+    if not isinstance(manifest, dict) or not isinstance(manifest.get("jobs"), list) or not manifest["jobs"]:
+        raise ValueError("the manifest needs a non-empty list of jobs")
+
+    jobs = []
+    for number, job in enumerate(manifest["jobs"], 1):
+        if not isinstance(job, dict):
+            raise ValueError(f"job {number} is not an object")
+        unknown = sorted(set(job) - JOB_KEYS)
+        if unknown:
+            raise ValueError(f"job {number} has unknown keys: {', '.join(unknown)}")
+        fmt = str(job.get("format", "")).upper()
+        if fmt not in JOB_FORMATS:
+            raise ValueError(f"job {number} needs a format of {' or '.join(JOB_FORMATS)}")
+        if not job.get("input_dir"):
+            raise ValueError(f"job {number} needs an input_dir")
+        formats = job.get("formats", ["xlsx"])
+        if isinstance(formats, str):
+            formats = [part.strip() for part in formats.split(",") if part.strip()]
+        if not formats or any(f not in OUTPUT_FORMATS for f in formats):
+            raise ValueError(f"job {number} has invalid formats {formats} (choose from {', '.join(OUTPUT_FORMATS)})")
+        if job.get("highlight_deltas") and not job.get("history"):
+            raise ValueError(f"job {number}: highlight_deltas needs history")
+        if fmt == "MA" and any(key in job for key in MB_ONLY_KEYS):
+            raise ValueError(f"job {number}: {', '.join(MB_ONLY_KEYS)} only apply to MB jobs")
+        horizon = job.get("horizon", DEFAULT_HORIZON)
+        if not isinstance(horizon, int) or not 1 <= horizon <= MAX_HORIZON:
+            raise ValueError(f"job {number}: horizon must be between 1 and {MAX_HORIZON}")
+        edi_layout = DEFAULT_EDI_LAYOUT
+        if job.get("edi_layout"):
+            try:
+                edi_layout = load_edi_layout(_resolve(base_dir, job["edi_layout"]))
+            except (OSError, TypeError, ValueError) as e:
+                raise ValueError(f"job {number}: invalid edi_layout: {e}")
+        read_ahead = job.get("read_ahead", DEFAULT_READ_AHEAD)
+        read_ahead_memory = job.get("read_ahead_memory", DEFAULT_READ_AHEAD_BYTES // (1024 * 1024))
+        if not isinstance(read_ahead, int) or not isinstance(read_ahead_memory, int) or read_ahead_memory < 1:
+            raise ValueError(f"job {number}: read_ahead must be a whole number and read_ahead_memory a positive one")
+
+        input_dir = _resolve(base_dir, job["input_dir"])
+        jobs.append({
+            "name": job.get("name") or os.path.basename(input_dir),
+            "format": fmt,
+            "input_dir": input_dir,
+            "output": _resolve(base_dir, job.get("output")),
+            "edi_file": (_resolve(base_dir, job.get("edi_file")) or os.path.join(input_dir, mb_script.DEFAULT_MERCEDES_FILE)
+                         if fmt == "MB" else None),
+            "options": RunOptions(use_cache=bool(job.get("use_cache", True)), write_only=bool(job.get("write_only", False)),
+                                  profile=bool(job.get("profile", False)), formats=tuple(formats),
+                                  history_file=_resolve(base_dir, job.get("history")),
+                                  highlight_deltas=bool(job.get("highlight_deltas", False)), read_ahead=read_ahead,
+                                  read_ahead_bytes=read_ahead_memory * 1024 * 1024, horizon=horizon, edi_layout=edi_layout),
+        })
+
+    summary = manifest.get("summary") or f"batch_summary_{datetime.now().strftime('%y%m%d_%H%M')}.json"
+    return {"workers": int(manifest.get("workers", 1)), "summary": _resolve(base_dir, summary), "jobs": jobs}
+
+def run_job(job):
+    """Runs one job with its script's pipeline and options. Returns its entry of the combined summary."""
+    entry = {"name": job["name"], "format": job["format"], "input_dir": job["input_dir"], "status": "ok"}
+    start = time.perf_counter()
+    report = None
+    try:
+        if not os.path.isdir(job["input_dir"]):
+            raise FileNotFoundError(f"input folder '{job['input_dir']}' not found")
+        if job["format"] == "MA":
+            report = ma_script.process_all_excel_files(job["options"], input_dir=job["input_dir"], output_file=job["output"])
+            if report is None:
+                entry["status"] = "no input files"
+        else:
+            output_file = job["output"] or os.path.join(job["input_dir"], mb_script.default_output_file())
+            report = mb_script.process_mb_files(job["input_dir"], output_file, job["edi_file"], job["options"])
+    except Exception as e:
+        print(f"Error in job {job['name']}: {e}")
+        entry["status"] = f"failed: {e}"
+    entry["seconds"] = round(time.perf_counter() - start, 4)
+
+    if report is not None:
+        files = report["files"]
+        entry["output_file"] = report["output_file"]
+        entry["files"] = sum(1 for f in files if f.get("ok"))
+        entry["failed_files"] = sum(1 for f in files if not f.get("ok") and "skipped" not in f)
+        entry["skipped_files"] = sum(1 for f in files if "skipped" in f)
+        entry["rows"] = next((s["rows"] for s in report["stages"] if s["stage"] in ("extract", "load_intermediate")), None)
+        entry["run_report"] = os.path.splitext(report["output_file"])[0] + "_report.json"
+    return entry
+
+def run_batch(manifest, workers=None):
+    """
+    Runs every job of a loaded manifest in order. With more than one worker the files of all
+    jobs are parsed on one shared, pre-warmed process pool, otherwise sequentially with each
+    job's read-ahead. Returns the combined summary.
+    """
+    workers = workers if workers is not None else manifest["workers"]
+    started = datetime.now().isoformat(timespec="seconds")
+    start = time.perf_counter()
+    entries = []
+    with (shared_worker_pool(workers, WARM_MODULES) if workers > 1 else contextlib.nullcontext()):
+        for number, job in enumerate(manifest["jobs"], 1):
+            print(f"\n{'=' * 30}\nJob {number}/{len(manifest['jobs'])}: {job['name']} ({job['format']}, {job['input_dir']})\n{'=' * 30}")
+            entries.append(run_job(dict(job, options=dataclasses.replace(job["options"], workers=workers))))
+    return {
+        "started": started,
+        "seconds": round(time.perf_counter() - start, 4),
+        "workers": workers,
+        "jobs": entries,
+        "failed_jobs": sum(1 for entry in entries if entry["status"].startswith("failed")),
+    }
+
+def print_summary(summary):
+    """Prints one line per job of a combined summary."""
+    print(f"\nBatch finished in {summary['seconds']:.1f} s with {summary['workers']} worker(s):")
+    for entry in summary["jobs"]:
+        files = f"{entry.get('files', 0)} files" + (f", {entry['failed_files']} failed" if entry.get("failed_files") else "")
+        print(f"- {entry['name']} ({entry['format']}): {entry['status']}, {files}, {entry['seconds']:.1f} s")
+        if entry.get("output_file"):
+            print(f"  Output: {entry['output_file']}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Runs the MA/MB jobs listed in a manifest in one process with a shared worker pool.")
+    parser.add_argument("manifest", help="JSON manifest listing the input folders, formats, outputs and EDI files.")
+    parser.add_argument("--workers", type=int, help="Worker processes shared by all jobs (default: the manifest's workers, else 1).")
+    parser.add_argument("--summary", help="Path of the combined JSON summary (default: the manifest's summary, else a timestamped file next to the manifest).")
+    args = parser.parse_args(argv)
+
+    try:
+        manifest = load_manifest(args.manifest)
+    except (OSError, ValueError) as e:
+        parser.error(f"invalid manifest '{args.manifest}': {e}")
+    summary_file = os.path.abspath(args.summary) if args.summary else manifest["summary"]
+
+    summary = run_batch(manifest, args.workers)
+    summary["manifest"] = os.path.abspath(args.manifest)
+    print_summary(summary)
+    with open(summary_file, "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2, default=str)
+    print(f"Batch summary saved to: {summary_file}")
+    return 1 if summary["failed_jobs"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
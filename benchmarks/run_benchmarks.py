@@ -0,0 +1,169 @@
+"""
+Times the MA and MB pipeline stages on a synthetic dataset and records peak memory.
+
+Usage:
+    python benchmarks/run_benchmarks.py --files 50 --items 2000 --weeks 52 --rows 20000
+
+Each stage is timed (best of --repeat runs) and then run once more under tracemalloc to
+record its peak Python heap usage. Results are written as JSON (benchmarks/results/ by
+default) together with the parameters and the git revision, so runs across versions can
+be compared.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from benchmarks.synthetic import generate_dataset
+from common.columnar import abs_frame, concat_frames, ruckstand_frame
+from MA import ma_script
+from MB import mb_script
+
+@contextlib.contextmanager
+def cache_home(path):
+    """Points the user's cache folder (see common.cache.cache_dir) at path while the block runs."""
+    saved = {name: os.environ.get(name) for name in ("XDG_CACHE_HOME", "LOCALAPPDATA")}
+    os.environ.update(dict.fromkeys(saved, path))
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+def git_revision():
+    """Returns the short git revision of the working tree, or None outside a git checkout."""
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def measure(func, repeat=1, setup=None):
+    """
+    Runs func (after setup, if given) repeat times for timing and once more under tracemalloc.
+    The scripts' console output is swallowed. Returns (result of the last run, seconds, peak bytes).
+    """
+    timings = []
+    result = None
+    for _ in range(repeat):
+        if setup:
+            setup()
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            result = func()
+            timings.append(time.perf_counter() - start)
+
+    if setup:
+        setup()
+    tracemalloc.start()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, min(timings), peak
+
+def excel_files(directory, exclude=()):
+    """Lists the generated input workbooks of a dataset directory in a stable order."""
+    return sorted(os.path.join(directory, f) for f in os.listdir(directory)
+                  if f.endswith(".xlsx") and f not in exclude)
+
+def run_benchmarks(directory, repeat=1):
+    """Runs every stage against the dataset in directory and returns {stage: measurements}."""
+    ma_dir = os.path.join(directory, "MA")
+    mb_dir = os.path.join(directory, "MB")
+    output_dir = os.path.join(directory, "output")
+    os.makedirs(output_dir, exist_ok=True)
+    stages = {}
+
+    def record(name, func, rows, setup=None):
+        result, seconds, peak = measure(func, repeat, setup)
+        stages[name] = {"seconds": round(seconds, 4), "peak_bytes": peak, "rows": rows(result)}
+        print(f"{name:<22} {seconds:9.3f} s  {peak / 1024 / 1024:9.1f} MB peak")
+        return result
+
+    # MA: extract every file, fill the week gaps, write the pivot
+    ma_files = excel_files(ma_dir)
+    ma_data = record("ma_extract", lambda: concat_frames(ma_script.extract_data_from_excel(f) for f in ma_files), len)
+    grid = record("ma_gap_fill", lambda: ma_script.post_process_calendar_weeks(ma_data), lambda g: int(g.size))
+    record("ma_pivot_write", lambda: ma_script.create_output_excel(grid, os.path.join(output_dir, "ma_pivot.xlsx")),
+           lambda _: int(grid.size))
+
+    # MB: extract every file, write the Bedarf pivot, update a fresh copy of the EDI plan
+    edi_template = os.path.join(mb_dir, "Mercedes_Shipping_Plan_EDI.xlsx")
+    edi_file = os.path.join(output_dir, "Mercedes_Shipping_Plan_EDI.xlsx")
+    mb_files = excel_files(mb_dir, exclude=(os.path.basename(edi_template),))
+
+    def extract_mb():
+        results = [mb_script.extract_mb_file(f) for f in mb_files]
+        return {
+            "bedarfs": concat_frames(result["bedarfs"] for result in results),
+            "abs_data": concat_frames((result["abs_data"] for result in results), empty=abs_frame),
+            "ruckstand": concat_frames((result["ruckstand"] for result in results), empty=ruckstand_frame),
+        }
+
+    mb_data = record("mb_extract", extract_mb, lambda d: len(d["bedarfs"]) + len(d["abs_data"]))
+    record("mb_pivot_write", lambda: mb_script.create_output_excel(mb_data["bedarfs"], os.path.join(output_dir, "mb_pivot.xlsx")),
+           lambda _: len(mb_data["bedarfs"]))
+    record("mb_mercedes_update",
+           lambda: mb_script.update_mercedes_file(mb_data["abs_data"], mb_data["ruckstand"], edi_file),
+           lambda _: len(mb_data["abs_data"]),
+           setup=lambda: shutil.copyfile(edi_template, edi_file))
+    return stages
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks the MA/MB pipelines on synthetic call-off workbooks.")
+    parser.add_argument("--files", type=int, default=10, help="Input files per format (default: 10).")
+    parser.add_argument("--items", type=int, default=200, help="Distinct MA part numbers (default: 200).")
+    parser.add_argument("--weeks", type=int, default=26, help="Calendar weeks covered by each file (default: 26).")
+    parser.add_argument("--rows", type=int, default=5000, help="Rows per MA export (default: 5000).")
+    parser.add_argument("--abs-rows", type=int, default=4, help="ABS rows per MB file (default: 4).")
+    parser.add_argument("--repeat", type=int, default=1, help="Timing runs per stage; the best is kept (default: 1).")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed of the generated data (default: 0).")
+    parser.add_argument("--data-dir", help="Generate the dataset here and keep it (default: a temporary directory).")
+    parser.add_argument("--output", help="Result JSON path (default: benchmarks/results/bench_<timestamp>.json).")
+    args = parser.parse_args()
+
+    params = {"files": args.files, "items": args.items, "weeks": args.weeks, "rows": args.rows,
+              "abs_rows": args.abs_rows, "repeat": args.repeat, "seed": args.seed}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        data_dir = args.data_dir or tmp_dir
+        print(f"Generating synthetic dataset in {data_dir} ...")
+        generate_dataset(data_dir, files=args.files, items=args.items, weeks=args.weeks, rows=args.rows,
+                         abs_rows=args.abs_rows, seed=args.seed)
+        # The Mercedes update caches its EDI index; keep that out of the real cache folder
+        with cache_home(tmp_dir):
+            stages = run_benchmarks(data_dir, repeat=args.repeat)
+
+    report = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": params,
+        "stages": stages,
+    }
+    output = args.output or os.path.join(ROOT, "benchmarks", "results",
+                                          f"bench_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results saved to: {output}")
+
+if __name__ == "__main__":
+    main()
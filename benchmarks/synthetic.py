@@ -0,0 +1,122 @@
+"""
+Synthetic call-off workbook generators for benchmarking the MA and MB scripts.
+
+The generated files follow the layouts the scripts read but contain random data only, so
+they can be shared and checked in results without exposing customer files.
+"""
+import os
+import random
+from datetime import date, datetime, timedelta
+
+from openpyxl import Workbook
+
+# Width of the generated Mercedes EDI sheet (up to column AC)
+EDI_COLUMNS = 29
+
+def week_labels(start, weeks):
+    """Returns `weeks` consecutive ISO weeks in MB 'WW/YYYY' format starting at the week of start."""
+    monday = start - timedelta(days=start.weekday())
+    labels = []
+    for offset in range(weeks):
+        year, week, _ = (monday + timedelta(weeks=offset)).isocalendar()
+        labels.append(f"{week:02d}/{year}")
+    return labels
+
+def item_numbers(items, prefix="A"):
+    """Returns `items` distinct part numbers shaped like Mercedes Sachnummern."""
+    return [f"{prefix}{2000000000 + n:010d}" for n in range(items)]
+
+def generate_ma_workbook(path, items, weeks, rows, start=None, seed=0):
+    """
+    Writes an MA call-off export with "Customer Item", "Quantity" and "Planned Receipt Date"
+    columns (plus a few unused columns, as in the real ERP exports).
+    """
+    rng = random.Random(seed)
+    start = start or date.today()
+    part_numbers = item_numbers(items, prefix="PN")
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Sheet1")
+    ws.append(["Order Number", "Customer Item", "Description", "Quantity", "Planned Receipt Date", "Status"])
+    for row in range(rows):
+        receipt_date = start + timedelta(days=rng.randrange(weeks * 7))
+        ws.append([
+            f"SO{row:08d}",
+            rng.choice(part_numbers),
+            "synthetic item",
+            rng.randint(1, 500),
+            datetime(receipt_date.year, receipt_date.month, receipt_date.day),
+            "Open",
+        ])
+    wb.save(path)
+
+def generate_mb_workbook(path, sachnummer, weeks, abs_rows, start=None, seed=0):
+    """
+    Writes an MB file with a "Zeitraum bis Bedarfsende" sheet (Sachnummer in row 2, weeks in
+    row 6, Bedarf in row 8, then ABS rows) and a "BKM Lieferbeziehung" sheet holding the
+    Rückstand of each ABS row in column 22.
+    """
+    rng = random.Random(seed)
+    start = start or date.today() - timedelta(weeks=2)
+    labels = week_labels(start, weeks)
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Zeitraum bis Bedarfsende")
+    ws.append(["Bedarfsübersicht"])
+    ws.append([f"Sachnummer:   {sachnummer}   Benennung: synthetic"])
+    ws.append([])
+    ws.append([])
+    ws.append([])
+    ws.append(["KW"] + labels)
+    ws.append([])
+    ws.append(["Bedarf"] + [rng.randint(0, 5000) for _ in labels])
+    ws.append(["Lieferabrufe"])
+    first_abs_row = 10
+    for n in range(abs_rows):
+        ws.append([f"ABS {100 + n}"] + [rng.randint(0, 900) if rng.random() > 0.2 else None for _ in labels])
+
+    bkm = wb.create_sheet("BKM Lieferbeziehung")
+    for row in range(1, first_abs_row + abs_rows):
+        values = [None] * 22
+        if row >= first_abs_row:
+            values[21] = rng.randint(0, 50)
+        bkm.append(values)
+    wb.save(path)
+
+def generate_edi_template(path, keys, seed=0):
+    """
+    Writes a Mercedes EDI shipping plan with an "EDI" sheet listing the given
+    (Sachnummer, ABS) keys in columns D and G, plus an untouched second sheet.
+    """
+    rng = random.Random(seed)
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "EDI"
+    ws.append([f"Column {n}" for n in range(1, EDI_COLUMNS + 1)])
+    for sachnummer, abs_value in keys:
+        row = [None] * EDI_COLUMNS
+        row[3] = sachnummer
+        row[6] = f"ABS {abs_value}" if rng.random() < 0.5 else str(abs_value)
+        ws.append(row)
+    wb.create_sheet("Stammdaten").append(["unchanged"])
+    wb.save(path)
+
+def generate_dataset(directory, files=10, items=200, weeks=26, rows=5000, abs_rows=4, seed=0):
+    """
+    Generates a complete benchmark dataset below directory:
+    MA/ holds `files` MA exports of `rows` rows over `items` part numbers and `weeks` weeks;
+    MB/ holds `files` MB files with `abs_rows` ABS rows each and a matching EDI template in
+    which every other key already exists. Returns the MA and MB directories.
+    """
+    ma_dir = os.path.join(directory, "MA")
+    mb_dir = os.path.join(directory, "MB")
+    os.makedirs(ma_dir, exist_ok=True)
+    os.makedirs(mb_dir, exist_ok=True)
+
+    for n in range(files):
+        generate_ma_workbook(os.path.join(ma_dir, f"calloff_{n:04d}.xlsx"), items, weeks, rows, seed=seed + n)
+
+    keys = []
+    for n, sachnummer in enumerate(item_numbers(files)):
+        generate_mb_workbook(os.path.join(mb_dir, f"mb_calloff_{n:04d}.xlsx"), sachnummer, weeks, abs_rows, seed=seed + n)
+        keys.extend((sachnummer, str(100 + a)) for a in range(abs_rows) if (n + a) % 2 == 0)
+    generate_edi_template(os.path.join(mb_dir, "Mercedes_Shipping_Plan_EDI.xlsx"), keys, seed=seed)
+    return ma_dir, mb_dir
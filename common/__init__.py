@@ -0,0 +1 @@
+"""Helpers shared by the MA and MB extraction scripts."""
@@ -0,0 +1,139 @@
+"""
+In-memory API of the MA and MB pipelines for embedding them in another process.
+
+Inputs are bytes or binary file-like objects (paths work too), outputs are DataFrames and
+small result objects; nothing is printed, prompted for or written to disk. pandas and openpyxl
+are only imported on the first call, so importing this module is cheap and has no side effects:
+
+    from common import api
+
+    demand = api.extract_ma(request_bytes)
+    grid = api.ma_pivot(demand)
+    delta = api.mercedes_delta(edi_bytes, mb_result.abs_data, mb_result.ruckstand)
+
+The frames are the typed intermediates described in common.columnar.
+"""
+import io
+from dataclasses import dataclass, field
+
+@dataclass
+class MBResult:
+    """Frames extracted from one or more MB workbooks; error is set if an extraction stopped early."""
+    bedarfs: "pandas.DataFrame"
+    abs_data: "pandas.DataFrame"
+    ruckstand: "pandas.DataFrame"
+    error: str = None
+    messages: list = field(default_factory=list)
+
+@dataclass
+class MercedesDelta:
+    """Outcome of a Mercedes EDI update; workbook holds the updated file, or None if nothing changed."""
+    summary: dict
+    workbook: bytes = None
+
+    @property
+    def changed(self):
+        return self.workbook is not None
+
+def _source(data):
+    """Wraps bytes in a file-like object; file-like objects and paths are passed through."""
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        return io.BytesIO(data)
+    return data
+
+def extract_ma(data, chunk_size=None):
+    """
+    Extracts an MA call-off export into a demand frame (quantities summed per customer item
+    and week). Raises KeyError if a required column is missing and openpyxl's errors if the
+    workbook cannot be read.
+    """
+    from common.ma_extract import aggregate_demand, open_demand_chunks
+    from common.xlsx_stream import DEFAULT_CHUNK_SIZE
+
+    return aggregate_demand(open_demand_chunks(_source(data), chunk_size=chunk_size or DEFAULT_CHUNK_SIZE))
+
+def extract_mb(data, current_week=None, name="workbook", horizon=None):
+    """
+    Extracts one MB workbook into an MBResult. current_week ("WW/YYYY") selects the start of
+    the ABS window and defaults to the current calendar week; horizon is the window's length in
+    weeks (default: 5). Raises ValueError if the workbook has no Sachnummer.
+    """
+    from common.mb_extract import DEFAULT_HORIZON, extract_mb_workbook
+
+    messages = []
+    result = extract_mb_workbook(_source(data), current_week, name=name, log=messages.append,
+                                 horizon=horizon or DEFAULT_HORIZON)
+    if result is None:
+        raise ValueError(f"Could not extract Customer Item from {name}")
+    return MBResult(result["bedarfs"], result["abs_data"], result["ruckstand"], result.get("error"), messages)
+
+def combine_ma(frames):
+    """Concatenates the demand frames of several MA exports in order."""
+    from common.columnar import concat_frames
+
+    return concat_frames(frames)
+
+def combine_mb(results):
+    """Concatenates several MBResults in order; errors and messages are collected."""
+    from common.columnar import abs_frame, concat_frames, ruckstand_frame
+
+    results = list(results)
+    errors = [result.error for result in results if result.error]
+    return MBResult(concat_frames(result.bedarfs for result in results),
+                    concat_frames((result.abs_data for result in results), empty=abs_frame),
+                    concat_frames((result.ruckstand for result in results), empty=ruckstand_frame),
+                    "; ".join(errors) or None,
+                    [message for result in results for message in result.messages])
+
+def ma_pivot(demand):
+    """
+    Builds the MA customer item x calendar week (YYCWXX) grid with every week between the first
+    and the last filled in with 0, items sorted.
+    """
+    from common.report import MA_REPORT, build_grid
+
+    return build_grid(demand, MA_REPORT)
+
+def mb_pivot(bedarfs):
+    """Builds the MB Bedarf grid (WW/YYYY weeks present in the data, items in the desired order)."""
+    from common.report import MB_REPORT, build_grid
+
+    return build_grid(bedarfs, MB_REPORT)
+
+def pivot_workbook(grid, current_week=None, fmt="YYCWXX", write_only=False):
+    """
+    Renders a grid from ma_pivot or mb_pivot as the formatted report workbook and returns its
+    bytes. current_week (in the grid's week format, fmt) is highlighted and defaults to today.
+    """
+    from common.calendar_weeks import current_week as format_current_week
+    from common.pivot import write_grid_workbook
+
+    buffer = io.BytesIO()
+    write_grid_workbook(grid, buffer, current_week or format_current_week(fmt), write_only=write_only)
+    return buffer.getvalue()
+
+def mercedes_delta(workbook, abs_data, ruckstand, layout=None):
+    """
+    Applies the ABS quantities and Rückstand to the EDI sheet of a Mercedes shipping plan given
+    as bytes or file-like object, with the column layout of a common.edi.EdiLayout (default:
+    quantities from column S in every second column). Only changed cells are written; the
+    updated workbook is only serialized if something changed. The changes are first planned
+    against a read-only pass over the EDI sheet, so the full workbook is only loaded if there
+    are any. Raises KeyError if the workbook has no EDI sheet.
+    """
+    from openpyxl import load_workbook
+    from common.edi import DEFAULT_EDI_LAYOUT, EDI_SHEET, apply_edi_plan, has_changes, plan_edi_update, read_edi_index
+
+    layout = layout or DEFAULT_EDI_LAYOUT
+    source = _source(workbook)
+    plan = plan_edi_update(read_edi_index(source), abs_data, ruckstand, layout)
+    summary = plan["summary"]
+    if not has_changes(summary):
+        return MercedesDelta(summary)
+    if hasattr(source, "seek"):
+        source.seek(0)
+    wb = load_workbook(source)
+    apply_edi_plan(wb[EDI_SHEET], plan)
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    return MercedesDelta(summary, buffer.getvalue())
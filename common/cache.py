@@ -0,0 +1,168 @@
+import hashlib
+import os
+import pickle
+import time
+
+from common.instrument import record_file
+from common.parallel import map_files
+from common.prefetch import DEFAULT_MAX_BYTES as DEFAULT_READ_AHEAD_BYTES
+
+CACHE_VERSION = 2
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024  # 256 MB of cached records
+
+def cache_dir():
+    """
+    Returns the per-user folder the caches are kept in. Caches are unpickled when loaded, so
+    they never live in the input folders, which other people (e.g. suppliers) can write to.
+    """
+    if os.name == "nt":
+        base = os.environ.get("LOCALAPPDATA") or os.path.join(os.path.expanduser("~"), "AppData", "Local")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "Helper")
+
+def cache_path(kind, path):
+    """
+    Returns the cache file of kind (e.g. "ma_extraction") for an input folder or file, named
+    after the path and a hash of its absolute form so folders with the same name do not clash.
+    """
+    path = os.path.abspath(path)
+    key = hashlib.sha256(os.path.normcase(path).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(cache_dir(), f"{kind}_{os.path.basename(path) or 'root'}_{key}.pkl")
+
+def write_private(cache_file, data):
+    """Pickles data to cache_file atomically, creating the cache folder readable by the user only."""
+    os.makedirs(os.path.dirname(cache_file), mode=0o700, exist_ok=True)
+    tmp_file = cache_file + ".tmp"
+    with open(tmp_file, "wb") as f:
+        pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_file, cache_file)
+
+def file_hash(path):
+    """Returns the SHA-256 hex digest of a file's content, read in 1 MB chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def load_cache(cache_file):
+    """
+    Loads the extraction cache from disk. Returns an empty cache if the file is missing,
+    unreadable or was written by an incompatible version.
+    """
+    empty = {"version": CACHE_VERSION, "entries": {}}
+    if not os.path.exists(cache_file):
+        return empty
+    try:
+        with open(cache_file, "rb") as f:
+            cache = pickle.load(f)
+    except Exception as e:
+        print(f"Warning: Could not read cache '{cache_file}', starting with an empty cache: {e}")
+        return empty
+    if not isinstance(cache, dict) or cache.get("version") != CACHE_VERSION:
+        return empty
+    return cache
+
+def cached_records(cache, path, context=None):
+    """
+    Returns the records cached for path, or None if the file is new or has changed.
+    Size and mtime are checked first; when only the mtime differs the content hash decides.
+    context is any extra value the records depend on (e.g. the current week) and must match.
+    An entry that cannot be checked (the file vanished) or unpickled (e.g. records pickled by
+    another pandas version) is dropped and counts as a miss.
+    """
+    key = os.path.abspath(path)
+    entry = cache["entries"].get(key)
+    if entry is None or entry.get("context") != context:
+        return None
+    try:
+        stat = os.stat(path)
+        if entry["size"] != stat.st_size:
+            return None
+        if entry["mtime"] != stat.st_mtime_ns:
+            if entry["sha256"] != file_hash(path):
+                return None
+            entry["mtime"] = stat.st_mtime_ns
+        records = pickle.loads(entry["blob"])
+    except Exception as e:
+        print(f"Warning: Dropping the cached data of '{os.path.basename(path)}': {e}")
+        del cache["entries"][key]
+        return None
+    entry["last_used"] = time.time()
+    return records
+
+def store_records(cache, path, records, context=None, sha256=None):
+    """
+    Stores the records extracted from path, keyed by path, size, mtime and content hash.
+    sha256 is the hash of the content the records came from if it is already known (e.g. from
+    read-ahead); otherwise the file is hashed.
+    """
+    stat = os.stat(path)
+    cache["entries"][os.path.abspath(path)] = {
+        "context": context,
+        "size": stat.st_size,
+        "mtime": stat.st_mtime_ns,
+        "sha256": sha256 or file_hash(path),
+        "blob": pickle.dumps(records, protocol=pickle.HIGHEST_PROTOCOL),
+        "last_used": time.time(),
+    }
+
+def evict_entries(cache, max_bytes=DEFAULT_MAX_BYTES):
+    """
+    Drops entries whose files no longer exist, then the least recently used entries until
+    the cached records fit within max_bytes. Returns the number of evicted entries.
+    """
+    entries = cache["entries"]
+    evicted = 0
+    for path in [p for p in entries if not os.path.exists(p)]:
+        del entries[path]
+        evicted += 1
+
+    total = sum(len(entry["blob"]) for entry in entries.values())
+    for path in sorted(entries, key=lambda p: entries[p]["last_used"]):
+        if total <= max_bytes:
+            break
+        total -= len(entries[path]["blob"])
+        del entries[path]
+        evicted += 1
+    return evicted
+
+def save_cache(cache, cache_file, max_bytes=DEFAULT_MAX_BYTES):
+    """Evicts stale entries and writes the cache atomically (see cache_path for where it goes)."""
+    evict_entries(cache, max_bytes)
+    try:
+        write_private(cache_file, cache)
+    except OSError as e:
+        print(f"Warning: Could not write cache '{cache_file}': {e}")
+
+def map_files_cached(func, paths, workers=1, cache=None, cacheable=lambda result: result is not None, context=None,
+                     read_ahead=0, read_ahead_bytes=DEFAULT_READ_AHEAD_BYTES):
+    """
+    Same as map_files, but answers unchanged files from the cache and only runs func on new or
+    changed files (only those are read ahead). Results that pass cacheable are stored back into
+    the cache under context, with the content hash computed during read-ahead where there is one.
+    """
+    if cache is None:
+        yield from map_files(func, paths, workers, read_ahead, read_ahead_bytes)
+        return
+
+    paths = list(paths)
+    hits = {}
+    for path in paths:
+        records = cached_records(cache, path, context)
+        if records is not None:
+            hits[path] = records
+
+    digests = {}
+    misses = map_files(func, [p for p in paths if p not in hits], workers, read_ahead, read_ahead_bytes, digests)
+    for path in paths:
+        if path in hits:
+            print(f"Using cached data for: {os.path.basename(path)}")
+            record_file(path, seconds=0.0, cached=True)
+            yield path, hits[path]
+            continue
+        _, result = next(misses)
+        if cacheable(result):
+            store_records(cache, path, result, context, digests.pop(path, None))
+        yield path, result
@@ -0,0 +1,112 @@
+"""
+ISO calendar week helpers shared by the MA (YYCWXX) and MB (WW/YYYY) scripts.
+
+Weeks are mapped to integer ordinals (weeks since Monday 1969-12-29), so ordering, ranges and
+arithmetic are plain integer operations. Whole datetime columns are converted with numpy
+arithmetic; only the distinct weeks are formatted as text.
+"""
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+MA_FORMAT = "YYCWXX"
+MB_FORMAT = "WW/YYYY"
+
+_EPOCH_MONDAY = date(1969, 12, 29)
+# 1970-01-01 (day 0 of datetime64[D]) is three days after the epoch Monday
+_EPOCH_OFFSET_DAYS = 3
+
+def week_ordinal(date_obj):
+    """Returns the week ordinal of a date or datetime."""
+    if hasattr(date_obj, "date"):
+        date_obj = date_obj.date()
+    return (date_obj - _EPOCH_MONDAY).days // 7
+
+def iso_week_ordinal(year, week):
+    """Returns the ordinal of ISO week `week` of `year` (week 1 is the week containing 4 January)."""
+    jan_4 = date(year, 1, 4)
+    return week_ordinal(jan_4) + week - 1
+
+def ordinal_to_iso_week(ordinal):
+    """Returns the (ISO year, ISO week) of a week ordinal."""
+    year, week, _ = (_EPOCH_MONDAY + timedelta(weeks=int(ordinal))).isocalendar()
+    return year, week
+
+def format_week(ordinal, fmt=MA_FORMAT):
+    """Formats a week ordinal as YYCWXX (MA) or WW/YYYY (MB)."""
+    year, week = ordinal_to_iso_week(ordinal)
+    if fmt == MA_FORMAT:
+        return f"{year % 100:02d}CW{week:02d}"
+    return f"{week:02d}/{year}"
+
+def parse_week(label, fmt=MA_FORMAT):
+    """
+    Returns the ordinal of a YYCWXX (MA, years 2000-2099) or WW/YYYY (MB) label.
+    Ordering by ordinal is the same as ordering by (year, week).
+    """
+    if fmt == MA_FORMAT:
+        return iso_week_ordinal(2000 + int(label[:2]), int(label[4:]))
+    week, year = str(label).split("/")
+    return iso_week_ordinal(int(year), int(week))
+
+def current_week(fmt=MA_FORMAT):
+    """Returns the current calendar week in the given format."""
+    return format_week(week_ordinal(date.today()), fmt)
+
+def dates_to_week_ordinals(dates):
+    """
+    Converts a datetime Series to week ordinals in one vectorized pass.
+    Returns a nullable Int32 Series; missing dates give <NA>.
+    """
+    dates = pd.to_datetime(dates)
+    valid = dates.notna().to_numpy()
+    days = dates.to_numpy(dtype="datetime64[D]")[valid].astype("int64")
+    ordinals = np.zeros(len(dates), dtype="int32")
+    ordinals[valid] = (days + _EPOCH_OFFSET_DAYS) // 7
+    return pd.Series(pd.arrays.IntegerArray(ordinals, ~valid), index=dates.index)
+
+def ordinals_to_weeks(ordinals, fmt=MA_FORMAT):
+    """
+    Formats a Series of week ordinals as calendar week labels, formatting each distinct week
+    once. Missing ordinals give None.
+    """
+    ordinals = pd.Series(ordinals, dtype="Int32")
+    valid = ordinals.notna().to_numpy()
+    unique, inverse = np.unique(ordinals[valid].to_numpy(dtype="int64"), return_inverse=True)
+    labels = np.array([format_week(o, fmt) for o in unique], dtype=object)
+
+    weeks = np.full(len(ordinals), None, dtype=object)
+    weeks[valid] = labels[inverse.reshape(-1)]
+    return pd.Series(weeks, index=ordinals.index)
+
+class WeekIndex:
+    """
+    The ordered, gap-free calendar weeks between two ordinals (inclusive), with constant-time
+    label <-> ordinal and label -> column position lookups. Only weeks that really exist are
+    included, so years with 52 weeks get no phantom week 53.
+    """
+
+    def __init__(self, first_ordinal, last_ordinal, fmt=MA_FORMAT):
+        self.fmt = fmt
+        self.first_ordinal = first_ordinal
+        self.labels = [format_week(o, fmt) for o in range(first_ordinal, last_ordinal + 1)]
+        self.positions = {label: position for position, label in enumerate(self.labels)}
+
+    def __len__(self):
+        return len(self.labels)
+
+    def __iter__(self):
+        return iter(self.labels)
+
+    def ordinal(self, label):
+        """Returns the ordinal of a label inside the index."""
+        return self.first_ordinal + self.positions[label]
+
+    def label(self, ordinal):
+        """Returns the label of an ordinal inside the index."""
+        return self.labels[ordinal - self.first_ordinal]
+
+    def position(self, label):
+        """Returns the 0-based position of a label, or None if it is outside the index."""
+        return self.positions.get(label)
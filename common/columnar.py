@@ -0,0 +1,132 @@
+"""
+Typed columnar intermediate passed between the extraction and reporting stages.
+
+Instead of lists of dicts, the stages exchange DataFrames with categorical item codes, int32
+week ordinals (see common.calendar_weeks) and int64 quantities:
+
+- demand:    customer_item (category), week (int32), quantity (int64)
+             MA call-off quantities and MB Bedarf.
+- abs:       customer_item, abs_value (category), slot (int8), week (Int32), quantity (Float64)
+             one row per week of the MB ABS window that lies inside the sheet; a missing
+             quantity means an empty cell (the Mercedes cell is cleared), a missing row means
+             the window ran past the end of the sheet (the cell is left alone). ABS cells
+             may hold decimals, so the quantities stay floats; whole ones are written back
+             to the Mercedes file as ints.
+- ruckstand: customer_item, abs_value (category), ruckstand (float64)
+
+The frames can be persisted as Parquet or Arrow IPC (Feather v2) files, which needs the
+optional pyarrow package, so a report can be regenerated without reading the Excel inputs.
+"""
+import os
+
+import pandas as pd
+
+from common.calendar_weeks import WeekIndex, format_week
+
+INTERMEDIATE_FORMATS = {"parquet": ".parquet", "arrow": ".arrow"}
+
+def demand_frame(customer_items=(), weeks=(), quantities=()):
+    """Builds a demand frame from parallel sequences of items, week ordinals and quantities."""
+    return pd.DataFrame({
+        "customer_item": pd.Categorical(list(customer_items)),
+        "week": pd.array(list(weeks), dtype="int32"),
+        "quantity": pd.array(list(quantities), dtype="int64"),
+    })
+
+def abs_frame(customer_items=(), abs_values=(), slots=(), weeks=(), quantities=()):
+    """
+    Builds an ABS frame; weeks and quantities may contain None for empty cells. Non-numeric
+    quantities are treated as empty.
+    """
+    return pd.DataFrame({
+        "customer_item": pd.Categorical(list(customer_items)),
+        "abs_value": pd.Categorical(list(abs_values)),
+        "slot": pd.array(list(slots), dtype="int8"),
+        "week": pd.array(list(weeks), dtype="Int32"),
+        "quantity": pd.to_numeric(pd.Series(list(quantities), dtype=object), errors="coerce").astype("Float64"),
+    })
+
+def ruckstand_frame(customer_items=(), abs_values=(), ruckstands=()):
+    """Builds a Rückstand frame; non-numeric Rückstand cells become NaN."""
+    return pd.DataFrame({
+        "customer_item": pd.Categorical(list(customer_items)),
+        "abs_value": pd.Categorical(list(abs_values)),
+        "ruckstand": pd.to_numeric(pd.Series(list(ruckstands), dtype=object), errors="coerce").astype("float64"),
+    })
+
+def concat_frames(frames, empty=demand_frame):
+    """
+    Concatenates frames of the same kind, keeping the categorical columns categorical
+    (pandas falls back to object when the categories differ). Empty frames are left out;
+    if none are left, empty() is returned.
+    """
+    frames = [frame for frame in frames if frame is not None and not frame.empty]
+    if not frames:
+        return empty()
+    combined = pd.concat(frames, ignore_index=True)
+    for column in frames[0].columns:
+        if isinstance(frames[0][column].dtype, pd.CategoricalDtype):
+            combined[column] = combined[column].astype("category")
+    return combined
+
+def pivot_grid(demand, fill_gaps=False, fmt=None):
+    """
+    Pivots a demand frame into a customer item x week grid in one pass. Items keep the order of
+    their first appearance and the first quantity of a repeated (item, week) wins. Columns are the week ordinals present, or every week between
+    the first and the last with fill_gaps; missing cells are 0. With fmt the columns are
+    relabelled as calendar week strings.
+    """
+    if demand.empty:
+        return pd.DataFrame()
+    demand = demand.drop_duplicates(subset=["customer_item", "week"], keep="first")
+    demand = demand.assign(customer_item=demand["customer_item"].astype(object))
+    grid = demand.pivot(index="customer_item", columns="week", values="quantity")
+    grid = grid.reindex(demand["customer_item"].unique())
+    if fill_gaps:
+        weeks = range(int(demand["week"].min()), int(demand["week"].max()) + 1)
+    else:
+        weeks = sorted(int(week) for week in demand["week"].unique())
+    grid = grid.reindex(columns=list(weeks)).fillna(0).astype("int64")
+    if fmt is not None:
+        if fill_gaps:
+            grid.columns = WeekIndex(weeks[0], weeks[-1], fmt).labels
+        else:
+            grid.columns = [format_week(week, fmt) for week in weeks]
+    grid.index.name = "customer_item"
+    grid.columns.name = "calendar_week"
+    return grid
+
+def intermediate_path(base_path, name, fmt):
+    """Returns the file of one intermediate frame, e.g. <base>_demand.parquet."""
+    return f"{os.path.splitext(base_path)[0]}_{name}{INTERMEDIATE_FORMATS[fmt]}"
+
+def save_frames(frames, base_path, fmt="parquet"):
+    """
+    Writes each named frame next to base_path as Parquet or Arrow IPC. Needs pyarrow.
+    Returns the written paths.
+    """
+    paths = []
+    for name, frame in frames.items():
+        path = intermediate_path(base_path, name, fmt)
+        if fmt == "parquet":
+            frame.to_parquet(path, index=False)
+        else:
+            frame.reset_index(drop=True).to_feather(path)
+        paths.append(path)
+    return paths
+
+def load_frames(base_path, names):
+    """
+    Reads the named frames saved by save_frames, detecting Parquet or Arrow IPC from the files
+    that exist. Raises FileNotFoundError if a frame is missing. Needs pyarrow.
+    """
+    frames = {}
+    for name in names:
+        for fmt in INTERMEDIATE_FORMATS:
+            path = intermediate_path(base_path, name, fmt)
+            if os.path.exists(path):
+                frames[name] = pd.read_parquet(path) if fmt == "parquet" else pd.read_feather(path)
+                break
+        else:
+            raise FileNotFoundError(f"No saved intermediate '{name}' for '{base_path}'")
+    return frames
@@ -0,0 +1,275 @@
+"""
+Delta update of the "EDI" sheet of the Mercedes shipping plan.
+
+The update rules live in plan_edi_update, which computes every cell change from a
+(Sachnummer, ABS) -> row index of the sheet, and apply_edi_plan writes those changes into an
+already loaded openpyxl worksheet, so the caller decides where the workbook comes from and
+whether to save it (MB/mb_script.py loads and saves the file on disk, common.api works on
+bytes). For large plans load_edi_index streams the EDI sheet once in read-only mode into that
+index, cached in the user's cache folder (see common.cache.cache_path) and keyed by the file's
+hash; only if the plan changes something does the full workbook have to be loaded, updated and
+saved.
+"""
+import json
+import os
+import pickle
+from dataclasses import dataclass
+from itertools import groupby
+
+import pandas as pd
+from openpyxl.styles import PatternFill
+from openpyxl.utils import column_index_from_string
+
+from common.calendar_weeks import MB_FORMAT, format_week
+
+EDI_SHEET = "EDI"
+# 1-based columns read to match the rows: Sachnummer (D) and ABS (G); Rückstand is written to R
+SACHNUMMER_COLUMN, ABS_COLUMN, RUCKSTAND_COLUMN = 4, 7, 18
+# 1-based columns a new row's Sachnummer (N) and ABS (P) are written to
+NEW_SACHNUMMER_COLUMN, NEW_ABS_COLUMN = 14, 16
+EDI_INDEX_VERSION = 2
+
+@dataclass(frozen=True)
+class EdiLayout:
+    """
+    Where the ABS window goes in the EDI sheet: the quantity of window slot i (0 = current week)
+    is written to first_quantity_column + i * column_step, so the mapping covers any horizon.
+    """
+    first_quantity_column: str = "S"
+    column_step: int = 2
+
+    def quantity_column(self, slot):
+        """Returns the 1-based column of a window slot."""
+        return column_index_from_string(self.first_quantity_column) + slot * self.column_step
+
+    def quantity_columns(self, horizon):
+        """Returns the 1-based columns of the first horizon slots."""
+        return [self.quantity_column(slot) for slot in range(horizon)]
+
+DEFAULT_EDI_LAYOUT = EdiLayout()
+
+def load_edi_layout(path):
+    """
+    Reads an EdiLayout from a JSON file such as {"first_quantity_column": "S", "column_step": 2};
+    missing keys keep their defaults. Raises ValueError for unknown keys or invalid values.
+    """
+    with open(path, encoding="utf-8") as f:
+        config = json.load(f)
+    if not isinstance(config, dict):
+        raise ValueError("the EDI layout must be a JSON object")
+    unknown = sorted(set(config) - {"first_quantity_column", "column_step"})
+    if unknown:
+        raise ValueError(f"unknown EDI layout keys: {', '.join(unknown)}")
+    layout = EdiLayout(**config)
+    if not isinstance(layout.first_quantity_column, str):
+        raise ValueError("first_quantity_column must be a column letter")
+    if not isinstance(layout.column_step, int) or layout.column_step < 1:
+        raise ValueError("column_step must be a positive integer")
+    layout.quantity_column(0)  # raises ValueError for an invalid column letter
+    return layout
+
+def _cell_value(value):
+    """Converts a value to what is stored in the cell: NaN clears it, integral floats become ints."""
+    if value is pd.NA or (isinstance(value, float) and pd.isna(value)):
+        return None
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+def _strip_abs_prefix(abs_value_raw):
+    """Returns (ABS value without an "ABS " prefix, whether the prefix was there)."""
+    if isinstance(abs_value_raw, str) and abs_value_raw.startswith("ABS "):
+        return abs_value_raw.split(" ", 1)[1], True
+    return abs_value_raw, False
+
+def has_changes(summary):
+    """Tells whether an update summary requires saving the workbook."""
+    return bool(summary["rows_added"] or summary["cells_changed"] or summary["header_cells_changed"])
+
+def apply_edi_plan(ws, plan):
+    """
+    Writes the changes planned by plan_edi_update into the EDI worksheet ws, which must hold the
+    sheet the plan was computed against. New rows go below the last row and are highlighted in
+    yellow across the sheet's used width.
+    """
+    yellow_fill = PatternFill(start_color="FFFF00", end_color="FFFF00", fill_type="solid")
+    row_numbers = dict(plan["row_numbers"])
+    # ws.max_row and ws.max_column scan every cell, so they are read once before writing
+    last_row = ws.max_row
+    max_column = ws.max_column
+    for row_number, abs_value in plan["prefixed_cells"]:
+        ws.cell(row=row_number, column=ABS_COLUMN).value = abs_value
+    for key in plan["new_rows"]:
+        last_row += 1
+        row_numbers[key] = last_row
+        for column in range(1, max_column + 1):
+            ws.cell(row=last_row, column=column).fill = yellow_fill
+    for key, column, value in plan["cells"]:
+        ws.cell(row=row_numbers[key], column=column).value = value
+    for column, value in plan["header_cells"]:
+        ws.cell(row=1, column=column).value = value
+
+def build_edi_index(rows):
+    """
+    Builds the lookup index of an EDI sheet from its rows of values (header row first), using
+    (Sachnummer, ABS without its "ABS " prefix) keys. Returns a dict with the header values,
+    {key: (row number, row values)} and [(row number, ABS value without prefix)] of the ABS
+    cells that still carry the prefix.
+    """
+    rows = iter(rows)
+    header = tuple(next(rows, ()))
+    index = {}
+    prefixed_cells = []
+    for row_number, values in enumerate(rows, 2):
+        if len(values) < ABS_COLUMN:
+            continue
+        sachnummer = values[SACHNUMMER_COLUMN - 1]
+        abs_value_raw = values[ABS_COLUMN - 1]
+        if sachnummer and abs_value_raw:
+            abs_value, prefixed = _strip_abs_prefix(abs_value_raw)
+            if prefixed:
+                prefixed_cells.append((row_number, abs_value))
+            index[(sachnummer, str(abs_value))] = (row_number, tuple(values))
+    return {"header": header, "rows": index, "prefixed_cells": prefixed_cells}
+
+def edi_index_path(workbook_file):
+    """Returns the path of the index cache of a Mercedes file in the user's cache folder."""
+    from common.cache import cache_path
+
+    return cache_path("edi_index", workbook_file)
+
+def read_edi_index(workbook_file):
+    """
+    Streams the EDI sheet of a workbook in read-only mode into an index (see build_edi_index)
+    without loading the other sheets or the styles. Raises KeyError if there is no EDI sheet.
+    """
+    from openpyxl import load_workbook
+
+    wb = load_workbook(workbook_file, read_only=True, keep_links=False)
+    try:
+        ws = wb[EDI_SHEET]
+        # The stored dimensions may be missing or wrong; read the rows that are really there
+        ws.reset_dimensions()
+        return build_edi_index(ws.iter_rows(values_only=True))
+    finally:
+        wb.close()
+
+def _file_signature(workbook_file):
+    from common.cache import file_hash
+
+    stat = os.stat(workbook_file)
+    return stat.st_size, stat.st_mtime_ns, file_hash(workbook_file)
+
+def save_edi_index(workbook_file, index):
+    """Caches the index of a workbook (see edi_index_path), keyed by the workbook's current hash."""
+    from common.cache import write_private
+
+    size, mtime, sha256 = _file_signature(workbook_file)
+    entry = {"version": EDI_INDEX_VERSION, "size": size, "mtime": mtime, "sha256": sha256, "index": index}
+    cache_file = edi_index_path(workbook_file)
+    try:
+        write_private(cache_file, entry)
+    except OSError as e:
+        print(f"Warning: Could not write EDI index '{cache_file}': {e}")
+
+def load_edi_index(workbook_file, use_cache=True):
+    """
+    Returns (index, whether it came from the cache). The cached index is used if the workbook's
+    size and mtime are unchanged or, when only the mtime differs, its content hash still
+    matches; otherwise the sheet is streamed again and the cache refreshed.
+    """
+    cache_file = edi_index_path(workbook_file)
+    if use_cache and os.path.exists(cache_file):
+        try:
+            with open(cache_file, "rb") as f:
+                entry = pickle.load(f)
+        except Exception:
+            entry = None
+        if isinstance(entry, dict) and entry.get("version") == EDI_INDEX_VERSION:
+            stat = os.stat(workbook_file)
+            if entry["size"] == stat.st_size and (entry["mtime"] == stat.st_mtime_ns or
+                                                   entry["sha256"] == _file_signature(workbook_file)[2]):
+                return entry["index"], True
+
+    index = read_edi_index(workbook_file)
+    if use_cache:
+        save_edi_index(workbook_file, index)
+    return index, False
+
+def plan_edi_update(index, abs_data, ruckstand, layout=DEFAULT_EDI_LAYOUT):
+    """
+    Computes the changes of writing the ABS quantities and Rückstand into the sheet described
+    by index (see build_edi_index), without touching the workbook. Returns a plan for
+    apply_edi_plan: the summary (rows_added, rows_changed, cells_changed, header_cells_changed),
+    the ABS cells to strip of their prefix, the keys of the new rows in order, the row numbers
+    of the existing rows written to, the (key, column, value) cell writes and the
+    (column, value) header writes. Cells are only written when their value changes.
+    """
+    summary = {"rows_added": 0, "rows_changed": 0, "cells_changed": len(index["prefixed_cells"]),
+               "header_cells_changed": 0}
+    rows = index["rows"]
+    new_rows = []
+    row_numbers = {}
+    cells = []
+    written = {}  # key -> {column: value} written so far by this plan
+
+    def set_value(key, column, value):
+        """Plans writing value unless the cell already holds it; NaN clears the cell like before."""
+        value = _cell_value(value)
+        row_written = written.setdefault(key, {})
+        if column in row_written:
+            current = row_written[column]
+        elif key in rows and column <= len(rows[key][1]):
+            current = rows[key][1][column - 1]
+        else:
+            current = None
+        if current == value:
+            return False
+        row_written[column] = value
+        cells.append((key, column, value))
+        return True
+
+    # Create a dictionary for faster lookup of Rückstand
+    ruckstand_data = {}
+    for item in ruckstand.itertuples(index=False):
+        ruckstand_data[(item.customer_item, item.abs_value)] = item.ruckstand
+
+    # The slot -> column mapping is computed once for the whole window
+    slot_columns = layout.quantity_columns(int(abs_data["slot"].max()) + 1 if len(abs_data) else 0)
+    header_values = {}
+    # The slots of one ABS row are consecutive in the frame
+    entries = groupby(abs_data.itertuples(index=False), key=lambda data: (data.customer_item, data.abs_value))
+    for (sachnummer, abs_value), slots in entries:
+        # Find the row or plan a new one
+        match_key = (sachnummer, str(abs_value))
+        if match_key in rows:
+            row_numbers[match_key] = rows[match_key][0]
+        elif match_key not in written:
+            new_rows.append(match_key)
+            written[match_key] = {NEW_SACHNUMMER_COLUMN: sachnummer, NEW_ABS_COLUMN: abs_value}
+            cells.append((match_key, NEW_SACHNUMMER_COLUMN, sachnummer))
+            cells.append((match_key, NEW_ABS_COLUMN, abs_value))
+            summary["rows_added"] += 1
+
+        changed = 0
+        # Fill Rückstand
+        if match_key in ruckstand_data:
+            changed += set_value(match_key, RUCKSTAND_COLUMN, ruckstand_data[match_key])
+
+        # Fill in the quantities; the week headers are written once after the loop
+        for data in slots:
+            column = slot_columns[data.slot]
+            changed += set_value(match_key, column, data.quantity)
+            header_values[column] = None if data.week is pd.NA else format_week(data.week, MB_FORMAT)
+        if changed:
+            summary["cells_changed"] += changed
+            summary["rows_changed"] += 1
+
+    header = index["header"]
+    header_cells = []
+    for column, cw in header_values.items():
+        if (header[column - 1] if column <= len(header) else None) != cw:
+            header_cells.append((column, cw))
+    summary["header_cells_changed"] = len(header_cells)
+    return {"summary": summary, "prefixed_cells": index["prefixed_cells"], "new_rows": new_rows,
+            "row_numbers": row_numbers, "cells": cells, "header_cells": header_cells}
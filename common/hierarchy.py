@@ -0,0 +1,144 @@
+"""
+Streaming flattener for level-coded customer hierarchy (BOM) exports.
+
+The export lists one entry per line with its level: 1 Sold-to BP, 2 Ship-to BP, 3 customer
+product number, 4 company product number and 5 SRE. Each run of SREs becomes one output row per
+group of `group_width` SREs, carrying the current Sold-to/Ship-to/product numbers.
+
+Everything is a generator: entries are read lazily from CSV, Excel (read-only) or text,
+flattened in a single pass and streamed to a CSV or write-only Excel writer, so memory stays
+flat however long the export is.
+"""
+import csv
+
+SOLD_TO_LEVEL, SHIP_TO_LEVEL, CUSTOMER_PN_LEVEL, COMPANY_PN_LEVEL, SRE_LEVEL = 1, 2, 3, 4, 5
+# Level -> position of the value in the output row
+PARENT_LEVELS = {SOLD_TO_LEVEL: 0, SHIP_TO_LEVEL: 1, CUSTOMER_PN_LEVEL: 2, COMPANY_PN_LEVEL: 3}
+PARENT_HEADERS = ["Sold-to BP", "Ship-to BP", "客户产品型号", "本公司产品型号"]
+DEFAULT_GROUP_WIDTH = 2
+
+def output_headers(group_width=DEFAULT_GROUP_WIDTH):
+    """Returns the header row of the flattened output: the four parents and SRE1..SRE<width>."""
+    return PARENT_HEADERS + [f"SRE{i}" for i in range(1, group_width + 1)]
+
+def parse_entries(rows):
+    """
+    Turns rows of (level, value, ...) into (level, value) entries. Rows whose level is not an
+    integer (headers, blank lines) are skipped; values are kept as text.
+    """
+    for row in rows:
+        if not row or len(row) < 2:
+            continue
+        try:
+            level = int(row[0])
+        except (TypeError, ValueError):
+            continue
+        value = row[1]
+        yield level, "" if value is None else str(value).strip()
+
+def read_csv_entries(path, delimiter=","):
+    """Streams the (level, value) entries of a CSV export with level and value in its first two columns."""
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        yield from parse_entries(csv.reader(f, delimiter=delimiter))
+
+def read_excel_entries(path, sheet_name=None):
+    """Streams the (level, value) entries of an Excel export (first sheet by default) in read-only mode."""
+    from common.xlsx_stream import open_read_only
+
+    wb = open_read_only(path)
+    try:
+        ws = wb[sheet_name] if sheet_name is not None else wb.worksheets[0]
+        yield from parse_entries(ws.iter_rows(max_col=2, values_only=True))
+    finally:
+        wb.close()
+
+def read_text_entries(lines):
+    """Streams the (level, value) entries of text lines such as "3 A000500301" (level, whitespace, value)."""
+    return parse_entries(line.split(None, 1) for line in lines)
+
+def read_entries(path, sheet_name=None):
+    """Picks the reader from the file extension: .xlsx/.xlsm Excel, .csv CSV, anything else text."""
+    lower = path.lower()
+    if lower.endswith((".xlsx", ".xlsm")):
+        return read_excel_entries(path, sheet_name)
+    if lower.endswith(".csv"):
+        return read_csv_entries(path)
+    return _read_text_file(path)
+
+def _read_text_file(path):
+    with open(path, encoding="utf-8-sig") as f:
+        yield from read_text_entries(f)
+
+def _sre_rows(parents, sres, group_width, fill):
+    """Splits a run of SREs into rows of group_width, padding the last one with fill."""
+    for i in range(0, len(sres), group_width):
+        group = sres[i:i + group_width]
+        yield parents + group + [fill] * (group_width - len(group))
+
+def flatten(entries, group_width=DEFAULT_GROUP_WIDTH, fill=""):
+    """
+    Flattens (level, value) entries in a single pass. The current parent values are tracked as
+    the entries go by; a run of SREs is held back until the next entry shows that the run has
+    ended (a one-item lookahead), then emitted as rows of the four parents plus group_width
+    SREs. Entries of unknown levels are ignored. Runs in O(n) time and O(group) memory.
+    """
+    if group_width < 1:
+        raise ValueError("group_width must be at least 1")
+    current = [None] * len(PARENT_LEVELS)
+    sres = []
+    for level, value in entries:
+        if level == SRE_LEVEL:
+            sres.append(value)
+            continue
+        # The SRE run ends at the next parent entry
+        if sres:
+            yield from _sre_rows(current, sres, group_width, fill)
+            sres = []
+        if level in PARENT_LEVELS:
+            current[PARENT_LEVELS[level]] = value
+    if sres:
+        yield from _sre_rows(current, sres, group_width, fill)
+
+def write_csv(rows, path, group_width=DEFAULT_GROUP_WIDTH):
+    """Streams flattened rows into a CSV file (UTF-8 with BOM so Excel shows the headers). Returns the row count."""
+    count = 0
+    with open(path, "w", newline="", encoding="utf-8-sig") as f:
+        writer = csv.writer(f)
+        writer.writerow(output_headers(group_width))
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    return count
+
+def write_xlsx(rows, path, group_width=DEFAULT_GROUP_WIDTH):
+    """
+    Streams flattened rows into a write-only Excel workbook with the bold, centred, bordered
+    header pandas.DataFrame.to_excel used to produce. Returns the row count.
+    """
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Alignment, Border, Font, Side
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Sheet1")
+    thin = Side(style="thin")
+    header_cells = []
+    for value in output_headers(group_width):
+        cell = WriteOnlyCell(ws, value=value)
+        cell.font = Font(bold=True)
+        cell.alignment = Alignment(horizontal="center", vertical="top")
+        cell.border = Border(left=thin, right=thin, top=thin, bottom=thin)
+        header_cells.append(cell)
+    ws.append(header_cells)
+    count = 0
+    for row in rows:
+        ws.append([None if value == "" else value for value in row])
+        count += 1
+    wb.save(path)
+    return count
+
+def write_rows(rows, path, group_width=DEFAULT_GROUP_WIDTH):
+    """Writes flattened rows as CSV or Excel depending on the extension of path. Returns the row count."""
+    if path.lower().endswith(".csv"):
+        return write_csv(rows, path, group_width)
+    return write_xlsx(rows, path, group_width)
@@ -0,0 +1,240 @@
+"""
+SQLite run history of the extracted MA/MB quantities.
+
+Every run that is given a history database appends its frames (see common.columnar) under a new
+run id, so "what changed since last week" is an indexed query instead of a comparison of old
+output workbooks:
+
+    python -m common.history MA/.ma_history.sqlite runs
+    python -m common.history MA/.ma_history.sqlite diff 12 13 [--output changes.csv]
+
+Tables (weeks are stored as ordinals, see common.calendar_weeks):
+
+- runs:      run_id, script ("MA"/"MB"), started, output_file
+- demand:    MA call-off quantities and MB Bedarf; indexed on (customer_item, week, run_id)
+- abs_data:  MB ABS window quantities; indexed on (sachnummer, abs_value, run_id)
+- ruckstand: MB Rückstand per ABS row
+
+Within a run the value the report shows is stored: the first quantity of a repeated
+(item, week) and the last ABS/Rückstand value of a repeated ABS row.
+"""
+import argparse
+import os
+import sqlite3
+import sys
+from datetime import datetime
+
+import pandas as pd
+
+from common.calendar_weeks import MA_FORMAT, MB_FORMAT, ordinals_to_weeks
+
+WEEK_FORMATS = {"MA": MA_FORMAT, "MB": MB_FORMAT}
+
+# Item columns have no declared type so numeric part numbers come back as numbers
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    script TEXT NOT NULL,
+    started TEXT NOT NULL,
+    output_file TEXT
+);
+CREATE TABLE IF NOT EXISTS demand (
+    run_id INTEGER NOT NULL REFERENCES runs(run_id),
+    customer_item NOT NULL,
+    week INTEGER NOT NULL,
+    quantity INTEGER NOT NULL,
+    PRIMARY KEY (run_id, customer_item, week)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS demand_item_week_run ON demand (customer_item, week, run_id);
+CREATE TABLE IF NOT EXISTS abs_data (
+    run_id INTEGER NOT NULL REFERENCES runs(run_id),
+    sachnummer NOT NULL,
+    abs_value NOT NULL,
+    week INTEGER NOT NULL,
+    quantity INTEGER,
+    PRIMARY KEY (run_id, sachnummer, abs_value, week)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS abs_data_sachnummer_abs_run ON abs_data (sachnummer, abs_value, run_id);
+CREATE TABLE IF NOT EXISTS ruckstand (
+    run_id INTEGER NOT NULL REFERENCES runs(run_id),
+    sachnummer NOT NULL,
+    abs_value NOT NULL,
+    ruckstand REAL,
+    PRIMARY KEY (run_id, sachnummer, abs_value)
+) WITHOUT ROWID;
+"""
+
+# table: (key columns, value column)
+TABLES = {
+    "demand": (["customer_item", "week"], "quantity"),
+    "abs_data": (["sachnummer", "abs_value", "week"], "quantity"),
+    "ruckstand": (["sachnummer", "abs_value"], "ruckstand"),
+}
+
+def open_history(path):
+    """Opens (and if needed creates) the history database at path."""
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA)
+    return conn
+
+def _nullable(value):
+    """Converts pandas missing values to NULL and numpy scalars to Python numbers."""
+    if value is pd.NA or (isinstance(value, float) and value != value):
+        return None
+    return value.item() if hasattr(value, "item") else value
+
+def _rows(frame, columns):
+    return zip(*(frame[column].astype(object).map(_nullable) for column in columns))
+
+def record_run(conn, script, demand=None, abs_data=None, ruckstand=None, output_file=None):
+    """
+    Appends one run: its demand frame and, for MB, its abs and ruckstand frames.
+    Returns the new run id.
+    """
+    with conn:
+        cursor = conn.execute("INSERT INTO runs (script, started, output_file) VALUES (?, ?, ?)",
+                              (script, datetime.now().isoformat(timespec="seconds"), output_file))
+        run_id = cursor.lastrowid
+        if demand is not None and not demand.empty:
+            demand = demand.drop_duplicates(subset=["customer_item", "week"], keep="first")
+            conn.executemany("INSERT INTO demand VALUES (?, ?, ?, ?)",
+                             ((run_id, *row) for row in _rows(demand, ["customer_item", "week", "quantity"])))
+        if abs_data is not None and not abs_data.empty:
+            abs_data = abs_data.dropna(subset=["week"])
+            abs_data = abs_data.drop_duplicates(subset=["customer_item", "abs_value", "week"], keep="last")
+            conn.executemany("INSERT INTO abs_data VALUES (?, ?, ?, ?, ?)",
+                             ((run_id, *row) for row in _rows(abs_data, ["customer_item", "abs_value", "week", "quantity"])))
+        if ruckstand is not None and not ruckstand.empty:
+            ruckstand = ruckstand.drop_duplicates(subset=["customer_item", "abs_value"], keep="last")
+            conn.executemany("INSERT INTO ruckstand VALUES (?, ?, ?, ?)",
+                             ((run_id, *row) for row in _rows(ruckstand, ["customer_item", "abs_value", "ruckstand"])))
+    return run_id
+
+def list_runs(conn, script=None):
+    """Returns the runs (optionally of one script) as a DataFrame, oldest first."""
+    query = "SELECT run_id, script, started, output_file FROM runs"
+    params = ()
+    if script is not None:
+        query += " WHERE script = ?"
+        params = (script,)
+    return pd.read_sql_query(query + " ORDER BY run_id", conn, params=params)
+
+def previous_run(conn, script, run_id):
+    """Returns the id of the last run of script before run_id, or None."""
+    row = conn.execute("SELECT MAX(run_id) FROM runs WHERE script = ? AND run_id < ?", (script, run_id)).fetchone()
+    return row[0]
+
+def run_script(conn, run_id):
+    """Returns the script ("MA"/"MB") of a run; raises KeyError for unknown runs."""
+    row = conn.execute("SELECT script FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+    if row is None:
+        raise KeyError(f"Unknown run {run_id}")
+    return row[0]
+
+def diff_table(conn, table, old_run, new_run):
+    """
+    Returns the rows of table whose value differs between two runs, including keys that only
+    exist in one of them, as a DataFrame of the key columns plus old_<value> and new_<value>
+    (None where the key is missing).
+    """
+    keys, value = TABLES[table]
+    key_list = ", ".join(keys)
+    join = " AND ".join(f"o.{key} = n.{key}" for key in keys)
+    query = f"""
+        SELECT {", ".join(f"n.{key}" for key in keys)}, o.{value}, n.{value}
+        FROM {table} n LEFT JOIN {table} o ON o.run_id = ? AND {join}
+        WHERE n.run_id = ? AND (o.run_id IS NULL OR o.{value} IS NOT n.{value})
+        UNION ALL
+        SELECT {", ".join(f"o.{key}" for key in keys)}, o.{value}, NULL
+        FROM {table} o
+        WHERE o.run_id = ? AND NOT EXISTS (SELECT 1 FROM {table} n WHERE n.run_id = ? AND {join})
+        ORDER BY {key_list}
+    """
+    rows = conn.execute(query, (old_run, new_run, old_run, new_run)).fetchall()
+    frame = pd.DataFrame(rows, columns=keys + [f"old_{value}", f"new_{value}"])
+    if value == "quantity":
+        # ABS cells may hold decimals, demand is summed whole numbers
+        dtype = "Float64" if table == "abs_data" else "Int64"
+        frame = frame.astype({"old_quantity": dtype, "new_quantity": dtype})
+    if "week" in keys:
+        frame = frame.astype({"week": "Int64"})
+    return frame
+
+def diff_runs(conn, old_run, new_run):
+    """
+    Compares two runs of the same script. Returns {table: changes} for the tables of that
+    script, with the week ordinals replaced by calendar week labels.
+    """
+    script = run_script(conn, new_run)
+    fmt = WEEK_FORMATS.get(script, MA_FORMAT)
+    tables = ["demand"] if script == "MA" else list(TABLES)
+    changes = {}
+    for table in tables:
+        frame = diff_table(conn, table, old_run, new_run)
+        if "week" in frame.columns:
+            frame["week"] = ordinals_to_weeks(frame["week"], fmt).to_numpy()
+            frame = frame.rename(columns={"week": "calendar_week"})
+        changes[table] = frame
+    return changes
+
+def changed_demand_cells(conn, old_run, new_run, fmt):
+    """
+    Returns {(customer item, calendar week label)} of the pivot cells that differ between two
+    runs; a missing quantity counts as 0, like in the gap-filled pivot.
+    """
+    frame = diff_table(conn, "demand", old_run, new_run)
+    frame = frame[frame["old_quantity"].fillna(0) != frame["new_quantity"].fillna(0)]
+    labels = ordinals_to_weeks(frame["week"], fmt)
+    return set(zip(frame["customer_item"], labels))
+
+def record_and_diff(history_file, script, output_file, demand, abs_data=None, ruckstand=None, highlight=False):
+    """
+    Appends a run to the history database and, with highlight, returns the pivot cells changed
+    since the previous run of the same script (None if there is none or highlight is off).
+    """
+    conn = open_history(history_file)
+    try:
+        run_id = record_run(conn, script, demand, abs_data, ruckstand, output_file)
+        print(f"Run {run_id} recorded in history: {history_file}")
+        old_run = previous_run(conn, script, run_id)
+        if not highlight or old_run is None:
+            return None
+        changed = changed_demand_cells(conn, old_run, run_id, WEEK_FORMATS[script])
+        print(f"{len(changed)} cells changed since run {old_run}.")
+        return changed
+    finally:
+        conn.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Lists runs in an MA/MB history database or compares two of them.")
+    parser.add_argument("database", help="History database written with --history.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    runs_parser = commands.add_parser("runs", help="List the recorded runs.")
+    runs_parser.add_argument("--script", choices=sorted(WEEK_FORMATS), help="Only list runs of this script.")
+    diff_parser = commands.add_parser("diff", help="Show the quantities that changed between two runs.")
+    diff_parser.add_argument("old_run", type=int)
+    diff_parser.add_argument("new_run", type=int)
+    diff_parser.add_argument("--output", help="Also write the changes as CSV (one file per table, named after this path).")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.database):
+        parser.error(f"history database '{args.database}' not found")
+    conn = open_history(args.database)
+    try:
+        if args.command == "runs":
+            print(list_runs(conn, args.script).to_string(index=False))
+            return
+        changes = diff_runs(conn, args.old_run, args.new_run)
+        for table, frame in changes.items():
+            print(f"\n{table}: {len(frame)} changed")
+            if not frame.empty:
+                print(frame.to_string(index=False))
+            if args.output:
+                path = f"{os.path.splitext(args.output)[0]}_{table}.csv"
+                frame.to_csv(path, index=False)
+                print(f"Saved to: {path}")
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    sys.exit(main())
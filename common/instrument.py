@@ -0,0 +1,140 @@
+"""
+Run instrumentation: wall time and rows handled per stage and per input file, and peak memory
+per stage.
+
+A run is started with start_run(); stage() and record_file() then collect measurements until
+finish_run() writes them as a JSON report, or abort_run() discards them. When no run is active
+both are no-ops, so library code can be instrumented unconditionally.
+
+Peak memory is the process' peak resident set size (high-water mark) at the end of the stage.
+It only ever grows, so it is not recorded per file: a file's value would mostly be that of the
+largest file parsed before it in the same process.
+"""
+import cProfile
+import io
+import json
+import os
+import pstats
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+_current_run = None
+
+def peak_rss_bytes():
+    """Returns the peak resident set size of this process in bytes, or None if unavailable."""
+    if sys.platform == "win32":
+        try:
+            import ctypes
+            from ctypes import wintypes
+
+            class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+                _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+                            ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                            ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                            ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t), ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                            ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t)]
+
+            counters = PROCESS_MEMORY_COUNTERS()
+            counters.cb = ctypes.sizeof(counters)
+            handle = ctypes.windll.kernel32.GetCurrentProcess()
+            if ctypes.windll.psapi.GetProcessMemoryInfo(handle, ctypes.byref(counters), counters.cb):
+                return int(counters.PeakWorkingSetSize)
+        except (AttributeError, OSError):
+            pass
+        return None
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return int(peak if sys.platform == "darwin" else peak * 1024)
+
+def start_run(script, profile=False):
+    """Starts collecting measurements for a run of script ("MA" or "MB"), optionally under cProfile."""
+    global _current_run
+    _current_run = {
+        "script": script,
+        "started": datetime.now().isoformat(timespec="seconds"),
+        "start_time": time.perf_counter(),
+        "stages": [],
+        "files": {},
+        "profiler": cProfile.Profile() if profile else None,
+    }
+    if _current_run["profiler"]:
+        _current_run["profiler"].enable()
+    return _current_run
+
+@contextmanager
+def stage(name, rows=None):
+    """
+    Times a pipeline stage. The yielded dict can be updated with the number of rows handled,
+    e.g. ``with stage("gap_fill") as s: ...; s["rows"] = len(grid)``.
+    """
+    record = {"stage": name, "rows": rows}
+    start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        if _current_run is not None:
+            record["seconds"] = round(time.perf_counter() - start, 4)
+            record["peak_rss_bytes"] = peak_rss_bytes()
+            _current_run["stages"].append(record)
+
+def record_file(path, **fields):
+    """Merges measurements (seconds, rows, cached, ok, ...) into the entry for path."""
+    if _current_run is None:
+        return
+    entry = _current_run["files"].setdefault(path, {"file": os.path.basename(path)})
+    entry.update(fields)
+
+def report_path(output_file, suffix="_report.json"):
+    """Returns the path of a report file next to the output workbook."""
+    return os.path.splitext(output_file)[0] + suffix
+
+def abort_run():
+    """Ends the active run without writing a report, e.g. when there is nothing to process."""
+    global _current_run
+    run, _current_run = _current_run, None
+    if run is not None and run["profiler"] is not None:
+        run["profiler"].disable()
+
+def finish_run(output_file, top=30):
+    """
+    Ends the active run and writes its JSON report next to output_file. With profiling, the raw
+    cProfile stats (.prof) and the top functions by cumulative time (.txt) are written as well.
+    Returns the report dict, or None if no run is active.
+    """
+    global _current_run
+    run, _current_run = _current_run, None
+    if run is None:
+        return None
+
+    profiler = run.pop("profiler")
+    report = {
+        "script": run["script"],
+        "started": run["started"],
+        "seconds": round(time.perf_counter() - run.pop("start_time"), 4),
+        "peak_rss_bytes": peak_rss_bytes(),
+        "output_file": os.path.abspath(output_file),
+        "stages": run["stages"],
+        "files": list(run["files"].values()),
+    }
+    try:
+        with open(report_path(output_file), "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, default=str)
+        print(f"Run report saved to: {report_path(output_file)}")
+    except OSError as e:
+        print(f"Warning: Could not write run report: {e}")
+
+    if profiler is not None:
+        profiler.disable()
+        profiler.dump_stats(report_path(output_file, "_profile.prof"))
+        summary = io.StringIO()
+        pstats.Stats(profiler, stream=summary).sort_stats("cumulative").print_stats(top)
+        with open(report_path(output_file, "_profile.txt"), "w", encoding="utf-8") as f:
+            f.write(summary.getvalue())
+        print(f"Profile saved to: {report_path(output_file, '_profile.prof')}")
+    return report
@@ -0,0 +1,44 @@
+"""
+Extraction of MA call-off exports into demand frames (see common.columnar).
+
+The functions take a path, a file-like object or anything else openpyxl can open and neither
+print nor touch the file system beyond reading the source; MA/ma_script.py adds the console
+messages around them.
+"""
+import pandas as pd
+
+from common.calendar_weeks import dates_to_week_ordinals
+from common.columnar import demand_frame
+from common.xlsx_stream import DEFAULT_CHUNK_SIZE, iter_column_chunks
+
+# Columns read from each MA call-off export
+REQUIRED_COLUMNS = ["Customer Item", "Quantity", "Planned Receipt Date"]
+
+def open_demand_chunks(source, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Opens an MA export and returns an iterator of DataFrames of at most chunk_size rows holding
+    the required columns. Raises KeyError if a required column is missing and openpyxl's
+    InvalidFileException (or another error) if the file cannot be opened.
+    """
+    return iter_column_chunks(source, REQUIRED_COLUMNS, chunk_size=chunk_size)
+
+def aggregate_demand(chunks):
+    """
+    Groups each chunk by customer item and week and folds it into running totals, so memory
+    grows with the number of distinct keys rather than the number of rows. Returns a demand
+    frame sorted by customer item and week ordinal.
+    """
+    totals = None
+    for df in chunks:
+        df["Planned Receipt Date"] = pd.to_datetime(df["Planned Receipt Date"])
+        df["Week"] = dates_to_week_ordinals(df["Planned Receipt Date"])
+        df = df.dropna(subset=["Customer Item", "Quantity", "Week"])
+        grouped = df.groupby(["Customer Item", "Week"])["Quantity"].sum()
+        totals = grouped if totals is None else totals.add(grouped, fill_value=0)
+
+    if totals is None or totals.empty:
+        return demand_frame()
+
+    totals = totals.sort_index()
+    return demand_frame(totals.index.get_level_values(0), totals.index.get_level_values(1),
+                        totals.astype("int64").tolist())
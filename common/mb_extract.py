@@ -0,0 +1,122 @@
+"""
+Extraction of MB call-off workbooks into Bedarf, ABS and Rückstand frames (see common.columnar).
+
+extract_mb_workbook takes a path or a file-like object and reports progress through an
+optional log callable instead of printing, so it can run inside a service as well as from
+MB/mb_script.py (which passes print).
+"""
+import re
+
+import pandas as pd
+
+from common.calendar_weeks import MB_FORMAT, current_week as format_current_week, parse_week
+from common.columnar import abs_frame, demand_frame, ruckstand_frame
+from common.xlsx_stream import open_workbook, read_sheet_rows
+
+BEDARF_SHEET = "Zeitraum bis Bedarfsende"
+# Rows of the Bedarf sheet read by the extractor (0-based): Sachnummer, weeks, Bedarf
+SACHNUMMER_ROW, CALENDAR_WEEK_ROW, BEDARF_ROW = 1, 5, 7
+ABS_PATTERN = re.compile(r"^\s*ABS\s+\d+\w*")
+# Column of "BKM Lieferbeziehung" holding the Rückstand (0-based)
+RUCKSTAND_COL = 21
+# Weeks of each ABS row copied to the Mercedes file by default, starting at the current week
+DEFAULT_HORIZON = 5
+MAX_HORIZON = 52
+
+def is_mb_row_needed(row_index, values):
+    """Keeps the Sachnummer, calendar week and Bedarf rows plus every ABS row."""
+    if row_index in (SACHNUMMER_ROW, CALENDAR_WEEK_ROW, BEDARF_ROW):
+        return True
+    first_cell_value = values[0] if values else None
+    return isinstance(first_cell_value, str) and ABS_PATTERN.match(first_cell_value) is not None
+
+def _ignore(message):
+    pass
+
+def extract_mb_workbook(source, current_week=None, name="workbook", log=None, horizon=DEFAULT_HORIZON):
+    """
+    Extracts the Bedarf, ABS and Rückstand frames from a single MB workbook.
+    The workbook is opened once and both sheets are streamed from that handle (a legacy .xls is
+    read in full through pandas instead); only the needed rows are kept, so memory grows with the number of ABS rows x weeks rather than the size of
+    the workbook. current_week ("WW/YYYY") defaults to the current calendar week; the ABS
+    window covers horizon weeks from it. name is used in the messages passed to log.
+    Returns a dict with "bedarfs" (demand), "abs_data" (abs) and "ruckstand" frames, or None if
+    the workbook has no Sachnummer. If an error interrupts the extraction, the partial result
+    carries an "error" key.
+    """
+    log = log or _ignore
+    if current_week is None:
+        current_week = format_current_week(MB_FORMAT)
+    result = {"bedarfs": demand_frame(), "abs_data": abs_frame(), "ruckstand": ruckstand_frame()}
+    wb = None
+    try:
+        wb = open_workbook(source)
+        df = read_sheet_rows(wb, BEDARF_SHEET, is_mb_row_needed)
+        customer_item_raw = df.loc[SACHNUMMER_ROW, 0]
+        match = re.search(r"Sachnummer:\s+(\S+)", customer_item_raw)
+        customer_item = match.group(1) if match else None
+        if customer_item is None:
+            log(f"Warning: Could not extract Customer Item from {name}")
+            return None
+        log(f"Sachnummer found: {customer_item}")
+
+        # Extract calendar weeks from row 6 (index 5)
+        calendar_weeks = df.loc[CALENDAR_WEEK_ROW, 1:].tolist()
+
+        # Extract data for Bedarf
+        quantities_bedarf = df.loc[BEDARF_ROW, 1:].tolist()
+        bedarf_weeks = []
+        bedarf_quantities = []
+        for cw, qty in zip(calendar_weeks, quantities_bedarf):
+            if pd.notna(cw) and pd.notna(qty):
+                bedarf_weeks.append(parse_week(cw, MB_FORMAT))
+                bedarf_quantities.append(int(qty))
+        bedarfs = demand_frame([customer_item] * len(bedarf_weeks), bedarf_weeks, bedarf_quantities)
+        result["bedarfs"] = bedarfs.sort_values("week", kind="stable", ignore_index=True)
+
+        # Find rows with "ABS" followed by a number (non-text cells never match)
+        first_column = df[0].astype(object)
+        abs_rows = df.index[first_column.str.match(ABS_PATTERN.pattern, na=False)].tolist()
+        if abs_rows:
+            log(f"ABS rows found in {name}")
+        else:
+            log(f"No ABS rows found in {name}")
+
+        # Strip the "ABS " prefix once for all ABS rows
+        abs_values_raw = first_column.loc[abs_rows].str.strip()
+        has_prefix = abs_values_raw.str.startswith("ABS ")
+        abs_values = abs_values_raw.where(~has_prefix, abs_values_raw.str.split(" ", n=1).str[1]).tolist()
+
+        # Locate the current week once per file
+        current_week_index = calendar_weeks.index(current_week) if current_week in calendar_weeks else None
+        if abs_rows and current_week_index is None:
+            log(f"Warning: Current week {current_week} not found in {name}")
+
+        # Extract the horizon data points of all ABS rows as one 2-D block; weeks past the end
+        # of the sheet have no slot
+        if current_week_index is not None and abs_rows:
+            window_columns = [col for col in range(current_week_index + 1, current_week_index + 1 + horizon) if col in df.columns]
+            window_weeks = [parse_week(calendar_weeks[col - 1], MB_FORMAT) if pd.notna(calendar_weeks[col - 1]) else None
+                            for col in window_columns]
+            block = df.loc[abs_rows, window_columns].to_numpy().ravel()
+            slots = len(window_columns)
+            result["abs_data"] = abs_frame([customer_item] * len(block),
+                                           [abs_value for abs_value in abs_values for _ in range(slots)],
+                                           list(range(slots)) * len(abs_rows), window_weeks * len(abs_rows), block)
+
+        # Extract data for Rückstand from the same workbook handle; without ABS rows there is none
+        if abs_rows:
+            abs_row_set = set(abs_rows)
+            df_bkm = read_sheet_rows(wb, "BKM Lieferbeziehung", lambda row_index, values: row_index in abs_row_set,
+                                     max_col=RUCKSTAND_COL + 1, max_row=max(abs_rows) + 1)
+            result["ruckstand"] = ruckstand_frame([customer_item] * len(abs_rows), abs_values,
+                                                  df_bkm.loc[abs_rows, RUCKSTAND_COL].tolist())
+
+    except Exception as e:
+        # Keep whatever was extracted before the error, as the sequential loop always did
+        log(f"Error processing {name}: {e}")
+        result["error"] = str(e)
+    finally:
+        if wb is not None:
+            wb.close()
+    return result
@@ -0,0 +1,81 @@
+"""
+The options of one MA or MB run, shared by the scripts' command lines and batch.py.
+
+RunOptions bundles them so the process, watch, extract and report functions of both scripts
+take one object instead of a dozen keyword arguments each, and an option added here reaches
+every entry point. add_run_arguments and options_from_args are the command-line side of it.
+"""
+from dataclasses import dataclass
+
+from common.columnar import INTERMEDIATE_FORMATS
+from common.edi import DEFAULT_EDI_LAYOUT, EdiLayout
+from common.mb_extract import DEFAULT_HORIZON
+from common.outputs import parse_formats
+from common.prefetch import DEFAULT_MAX_BYTES as DEFAULT_READ_AHEAD_BYTES, DEFAULT_READ_AHEAD
+
+@dataclass(frozen=True)
+class RunOptions:
+    """
+    workers: processes parsing the input files (1 parses them in this process); results are
+        merged in file order.
+    use_cache: take the records of unchanged files from the extraction cache (see common.cache).
+    write_only: stream the output workbook instead of building it in memory.
+    profile: also profile the run with cProfile, next to the JSON run report.
+    formats: report outputs ("xlsx", "csv", "parquet"), all written from one grid; for MB, csv
+        and parquet also write the ABS/Rückstand extract.
+    save_intermediate: "parquet" or "arrow" to also save the extracted frames next to the output.
+    from_intermediate: output file base whose saved frames replace reading the inputs.
+    history_file: SQLite history the run is appended to (see common.history); highlight_deltas
+        then highlights the demand cells changed since the previous run.
+    read_ahead, read_ahead_bytes: files (and bytes at most) read in the background during a
+        sequential run, so reading overlaps with parsing (see common.prefetch).
+    horizon, edi_layout: ABS window length in weeks from the current week and the Mercedes EDI
+        column layout its weeks go to (MB only, see common.edi).
+    interval, debounce: polling and quiet seconds of watch mode.
+    """
+    workers: int = 1
+    use_cache: bool = True
+    write_only: bool = False
+    profile: bool = False
+    formats: tuple = ("xlsx",)
+    save_intermediate: str = None
+    from_intermediate: str = None
+    history_file: str = None
+    highlight_deltas: bool = False
+    read_ahead: int = DEFAULT_READ_AHEAD
+    read_ahead_bytes: int = DEFAULT_READ_AHEAD_BYTES
+    horizon: int = DEFAULT_HORIZON
+    edi_layout: EdiLayout = DEFAULT_EDI_LAYOUT
+    interval: float = 1.0
+    debounce: float = 2.0
+
+DEFAULT_OPTIONS = RunOptions()
+
+def add_run_arguments(parser, inputs="input files", outputs="the report", cells="cells", format_note=""):
+    """
+    Adds the command-line options shared by both scripts to an argparse parser; the texts name
+    what the script reads and writes. options_from_args turns the parsed arguments into RunOptions.
+    """
+    parser.add_argument("--workers", type=int, default=1, help="Number of worker processes used to parse the input files (default: 1).")
+    parser.add_argument("--no-cache", action="store_true", help="Re-parse every input file instead of reusing cached records of unchanged files.")
+    parser.add_argument("--write-only", action="store_true", help="Stream the output workbook row by row to keep memory flat for very large pivots.")
+    parser.add_argument("--profile", action="store_true", help="Also dump cProfile stats of the run next to the output file.")
+    parser.add_argument("--format", type=parse_formats, default=["xlsx"], help=f"Comma-separated report formats: xlsx, csv, parquet{format_note} (default: xlsx; parquet needs pyarrow).")
+    parser.add_argument("--save-intermediate", choices=sorted(INTERMEDIATE_FORMATS), help="Also save the extracted data as Parquet or Arrow IPC next to the output file (needs pyarrow).")
+    parser.add_argument("--from-intermediate", metavar="OUTPUT_FILE", help=f"Regenerate {outputs} from the intermediate data saved with an earlier output file instead of reading the {inputs}.")
+    parser.add_argument("--history", metavar="DATABASE", help="Append the extracted quantities of this run to a SQLite history database.")
+    parser.add_argument("--highlight-deltas", action="store_true", help=f"Highlight the {cells} that changed since the previous run in the history (needs --history).")
+    parser.add_argument("--read-ahead", type=int, default=DEFAULT_READ_AHEAD, help=f"Number of {inputs} read into memory ahead of the parser in a sequential run, 0 to disable (default: {DEFAULT_READ_AHEAD}).")
+    parser.add_argument("--read-ahead-memory", type=int, default=DEFAULT_READ_AHEAD_BYTES // (1024 * 1024), metavar="MB", help=f"Memory cap of the files read ahead (default: {DEFAULT_READ_AHEAD_BYTES // (1024 * 1024)} MB).")
+    parser.add_argument("--watch", action="store_true", help=f"Keep running and regenerate {outputs} whenever {inputs} are added or changed.")
+    parser.add_argument("--interval", type=float, default=1.0, help="Seconds between polls of the folder in watch mode (default: 1).")
+    parser.add_argument("--debounce", type=float, default=2.0, help="Seconds the folder must be quiet before a refresh in watch mode (default: 2).")
+
+def options_from_args(args, **extra):
+    """Builds RunOptions from the parsed command line shared by both scripts; extra sets the rest."""
+    return RunOptions(workers=args.workers, use_cache=not args.no_cache, write_only=args.write_only,
+                      profile=args.profile, formats=tuple(args.format), save_intermediate=args.save_intermediate,
+                      from_intermediate=args.from_intermediate, history_file=args.history,
+                      highlight_deltas=args.highlight_deltas, read_ahead=args.read_ahead,
+                      read_ahead_bytes=args.read_ahead_memory * 1024 * 1024, interval=args.interval,
+                      debounce=args.debounce, **extra)
@@ -0,0 +1,94 @@
+"""
+Output backends of the MA and MB reports.
+
+Every selected format is written from the same in-memory grid or frame, so adding CSV or
+Parquet next to the styled workbook costs no extra extraction or pivoting. The xlsx report is
+the formatted workbook; csv and parquet are plain tables meant for downstream jobs (parquet
+needs the optional pyarrow package).
+"""
+import argparse
+import os
+
+from common.calendar_weeks import ordinals_to_weeks
+from common.instrument import stage
+from common.pivot import write_grid_workbook
+
+OUTPUT_FORMATS = ("xlsx", "csv", "parquet")
+
+def parse_formats(value):
+    """Parses a comma-separated --format value such as "xlsx,csv"; for use as an argparse type."""
+    formats = []
+    for fmt in value.split(","):
+        fmt = fmt.strip().lower()
+        if fmt not in OUTPUT_FORMATS:
+            raise argparse.ArgumentTypeError(f"unknown format '{fmt}' (choose from {', '.join(OUTPUT_FORMATS)})")
+        if fmt not in formats:
+            formats.append(fmt)
+    return formats
+
+def output_path(output_file, fmt, suffix=""):
+    """Returns the file of one output format, e.g. extracted_data_<ts>.csv for extracted_data_<ts>.xlsx."""
+    return f"{os.path.splitext(output_file)[0]}{suffix}.{fmt}"
+
+def write_table(frame, output_file, fmt, suffix=""):
+    """Writes a plain table as csv or parquet next to output_file. Returns the written path."""
+    path = output_path(output_file, fmt, suffix)
+    with stage(f"{fmt}_write", rows=len(frame)):
+        if fmt == "csv":
+            frame.to_csv(path, index=False)
+        else:
+            frame.to_parquet(path, index=False)
+    return path
+
+def write_grid_outputs(grid, output_file, current_week, formats=("xlsx",), write_only=False, changed_cells=None):
+    """
+    Writes a customer item x calendar week grid in every selected format. output_file is the
+    xlsx report; the other formats replace its extension. changed_cells are highlighted in the
+    xlsx report (see write_pivot_workbook). Returns (written paths, whether the
+    current week was highlighted in the xlsx report).
+    """
+    paths = []
+    highlighted = False
+    table = None
+    for fmt in formats:
+        if fmt == "xlsx":
+            highlighted = write_grid_workbook(grid, output_file, current_week, write_only=write_only,
+                                              changed_cells=changed_cells)
+            paths.append(output_file)
+            continue
+        if table is None:
+            table = grid.rename_axis(index="Customer Item", columns=None).reset_index()
+        paths.append(write_table(table, output_file, fmt))
+    return paths, highlighted
+
+def abs_extract_table(abs_data, ruckstand, fmt):
+    """
+    Flattens the abs and ruckstand frames (see common.columnar) into one long table with a row
+    per Sachnummer, ABS and calendar week of the window, plus the ABS row's Rückstand, in file
+    order. ABS rows without a window (current week not in the file) keep one row with an empty
+    week.
+    """
+    weeks = abs_data.assign(calendar_week=ordinals_to_weeks(abs_data["week"], fmt).to_numpy())
+    weeks = weeks[["customer_item", "abs_value", "calendar_week", "quantity"]]
+    # Like the Mercedes update, the last Rückstand seen for an ABS row wins
+    ruckstand = ruckstand.drop_duplicates(subset=["customer_item", "abs_value"], keep="last")
+    keys = ["customer_item", "abs_value"]
+    weeks = weeks.astype({key: object for key in keys})
+    ruckstand = ruckstand.astype({key: object for key in keys})
+    table = ruckstand.merge(weeks, on=keys, how="left")
+    return table[["customer_item", "abs_value", "ruckstand", "calendar_week", "quantity"]]
+
+def write_abs_extract(abs_data, ruckstand, output_file, week_format, formats=("csv",)):
+    """
+    Writes the MB ABS/Rückstand extract as <output>_abs_extract.csv/.parquet for every selected
+    table format (the xlsx counterpart is the Mercedes EDI update). Returns the written paths.
+    """
+    table = None
+    paths = []
+    for fmt in formats:
+        if fmt == "xlsx":
+            continue
+        if table is None:
+            table = abs_extract_table(abs_data, ruckstand, week_format)
+        paths.append(write_table(table, output_file, fmt, suffix="_abs_extract"))
+    return paths
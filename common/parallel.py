@@ -0,0 +1,82 @@
+import contextlib
+import importlib
+import io
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from common.instrument import record_file
+from common.prefetch import DEFAULT_MAX_BYTES, read_ahead as read_ahead_files
+
+# Process pool shared by every map_files call inside shared_worker_pool()
+_shared_pool = None
+
+def _call_timed(func, path, source=None):
+    """Runs func(path), or func(path, source=source) for a read-ahead buffer, and returns (result, seconds)."""
+    start = time.perf_counter()
+    result = func(path) if source is None else func(path, source=source)
+    return result, round(time.perf_counter() - start, 4)
+
+def _call_captured(func, path):
+    """Runs func(path) in a worker process, capturing everything it prints."""
+    buffer = io.StringIO()
+    with contextlib.redirect_stdout(buffer):
+        try:
+            result, seconds = _call_timed(func, path)
+        except Exception as e:
+            print(f"Error processing {path}: {e}")
+            result, seconds = None, None
+    return result, buffer.getvalue(), seconds
+
+def _import_modules(modules):
+    """Worker initializer: imports modules once so every later task starts warm."""
+    for module in modules:
+        importlib.import_module(module)
+
+@contextlib.contextmanager
+def shared_worker_pool(workers, warm_modules=()):
+    """
+    Runs the enclosed map_files calls on one process pool of workers processes instead of a
+    pool per call, so a batch of jobs pays process start-up and the imports of warm_modules
+    (e.g. pandas, openpyxl and the extraction code) once per worker.
+    """
+    global _shared_pool
+    with ProcessPoolExecutor(max_workers=workers, initializer=_import_modules, initargs=(tuple(warm_modules),)) as executor:
+        _shared_pool = executor
+        try:
+            yield executor
+        finally:
+            _shared_pool = None
+
+def map_files(func, paths, workers=1, read_ahead=0, read_ahead_bytes=DEFAULT_MAX_BYTES, digests=None):
+    """
+    Applies func to every path and yields (path, result) pairs in input order.
+    With more than one worker the calls run in a process pool; whatever a call prints is
+    replayed in input order so the console output matches the sequential run.
+    Sequential calls can read up to read_ahead files (read_ahead_bytes at most) in the
+    background, see common.prefetch; func is then called as func(path, source=buffer), and the
+    content hashes of the files read ahead are stored in the digests dict if one is given.
+    Inside shared_worker_pool() the calls always run on the shared pool, whatever workers is.
+    The time of each call is recorded for the run report.
+    """
+    paths = list(paths)
+    if (_shared_pool is None and (workers is None or workers <= 1)) or len(paths) <= 1:
+        for path, source in read_ahead_files(paths, read_ahead, read_ahead_bytes, digests=digests):
+            result, seconds = _call_timed(func, path, None if source is path else source)
+            record_file(path, seconds=seconds, cached=False)
+            yield path, result
+        return
+
+    if _shared_pool is not None:
+        yield from _map_pool(_shared_pool, func, paths)
+        return
+    with ProcessPoolExecutor(max_workers=min(workers, len(paths))) as executor:
+        yield from _map_pool(executor, func, paths)
+
+def _map_pool(executor, func, paths):
+    futures = [executor.submit(_call_captured, func, path) for path in paths]
+    for path, future in zip(paths, futures):
+        result, output, seconds = future.result()
+        if output:
+            print(output, end="")
+        record_file(path, seconds=seconds, cached=False)
+        yield path, result
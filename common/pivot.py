@@ -0,0 +1,123 @@
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, Alignment, PatternFill
+from openpyxl.utils import get_column_letter
+
+from common.instrument import stage
+
+# Styles are immutable and shared by every workbook, so they are created once
+HEADER_FONT = Font(bold=True)
+HEADER_FILL = PatternFill(start_color="D3D3D3", end_color="D3D3D3", fill_type="solid")
+CURRENT_WEEK_FILL = PatternFill(start_color="FFFF00", end_color="FFFF00", fill_type="solid")  # Yellow fill
+HEADER_ALIGNMENT = Alignment(horizontal='center')
+CHANGED_FILL = PatternFill(start_color="FFC000", end_color="FFC000", fill_type="solid")  # Orange fill
+
+def pivot_column_widths(customer_items, calendar_weeks, week_extremes):
+    """
+    Computes the autofit widths of a pivot sheet from the data instead of the written cells.
+    The longest text of an integer column is its minimum or maximum, so week_extremes
+    ({week: (min, max)}) is all that is needed; the result equals fitting the finished sheet.
+    """
+    widths = [max([len("Customer Item")] + [len(str(item)) for item in customer_items if item]) + 2]
+    for cw in calendar_weeks:
+        lengths = [len(str(cw))] + [len(str(value)) for value in week_extremes.get(cw, ()) if value]
+        widths.append(max(lengths) + 2)
+    return widths
+
+def write_pivot_workbook(calendar_weeks, rows, output_file, current_week, column_widths=None, write_only=False,
+                         changed_cells=None):
+    """
+    Writes a pivot table-like workbook: grey header row, current calendar week highlighted in
+    yellow, first row and column frozen and column widths fitted to the content.
+    With column_widths (see pivot_column_widths) the widths are applied directly instead of
+    walking the finished sheet. write_only streams the rows through openpyxl's write-only
+    workbook so memory stays flat however many rows there are; it requires column_widths.
+    changed_cells is an optional set of (customer item, calendar week) whose data cells are
+    filled orange, e.g. the deltas against the previous run (see common.history).
+    Returns True if the current calendar week was found and highlighted.
+    """
+    if write_only and column_widths is None:
+        raise ValueError("write_only output needs precomputed column_widths")
+
+    wb = Workbook(write_only=write_only)
+    ws = wb.create_sheet("Extracted Data") if write_only else wb.active
+    ws.title = "Extracted Data"
+
+    header_row = ["Customer Item"] + list(calendar_weeks)
+    highlighted = current_week in header_row[1:]
+
+    # Freeze the first row and first column
+    ws.freeze_panes = "B2"
+    if column_widths is not None:
+        for col_index, width in enumerate(column_widths, 1):
+            ws.column_dimensions[get_column_letter(col_index)].width = width
+
+    if write_only:
+        # Styled header cells are emitted as part of the first row
+        header_cells = []
+        for value in header_row:
+            cell = WriteOnlyCell(ws, value=value)
+            cell.font = HEADER_FONT
+            cell.fill = CURRENT_WEEK_FILL if highlighted and value == current_week else HEADER_FILL
+            cell.alignment = HEADER_ALIGNMENT
+            header_cells.append(cell)
+        ws.append(header_cells)
+        for row_data in rows:
+            if changed_cells:
+                row_data = list(row_data)
+                for col_index, cw in enumerate(calendar_weeks, 1):
+                    if (row_data[0], cw) in changed_cells:
+                        cell = WriteOnlyCell(ws, value=row_data[col_index])
+                        cell.fill = CHANGED_FILL
+                        row_data[col_index] = cell
+            ws.append(row_data)
+    else:
+        # Create header row
+        ws.append(header_row)
+        for cell in ws[1]:
+            cell.font = HEADER_FONT
+            cell.fill = HEADER_FILL
+            cell.alignment = HEADER_ALIGNMENT
+
+        # Highlight the current calendar week cell in yellow
+        if highlighted:
+            ws.cell(row=1, column=header_row.index(current_week, 1) + 1).fill = CURRENT_WEEK_FILL
+
+        # Create data rows
+        for row_data in rows:
+            ws.append(row_data)
+            if changed_cells:
+                for col_index, cw in enumerate(calendar_weeks, 2):
+                    if (row_data[0], cw) in changed_cells:
+                        ws.cell(row=ws.max_row, column=col_index).fill = CHANGED_FILL
+
+        # Auto-adjust column widths
+        if column_widths is None:
+            for col in ws.columns:
+                max_length = 0
+                column = col[0].column_letter
+                for cell in col:
+                    if cell.value:
+                        max_length = max(max_length, len(str(cell.value)))
+                adjusted_width = (max_length + 2)
+                ws.column_dimensions[column].width = adjusted_width
+
+    # Save the workbook
+    with stage("pivot_save"):
+        wb.save(output_file)
+    return highlighted
+
+def write_grid_workbook(grid, output_file, current_week, write_only=False, changed_cells=None):
+    """
+    Writes a customer item x calendar week grid (columns labelled with calendar weeks, see
+    common.columnar.pivot_grid) with write_pivot_workbook. The column widths come from the
+    grid's per-week extremes, not from a pass over the finished sheet. changed_cells is passed
+    on to write_pivot_workbook. Returns True if the current calendar week was found and highlighted.
+    """
+    calendar_weeks = list(grid.columns)
+    week_extremes = dict(zip(calendar_weeks, zip(grid.min().tolist(), grid.max().tolist())))
+    column_widths = pivot_column_widths(grid.index, calendar_weeks, week_extremes)
+    # Rows are converted one at a time so write-only mode never holds a copy of the whole grid
+    rows = ([customer_item, *values.tolist()] for customer_item, values in zip(grid.index, grid.to_numpy()))
+    return write_pivot_workbook(calendar_weeks, rows, output_file, current_week,
+                                column_widths=column_widths, write_only=write_only, changed_cells=changed_cells)
@@ -0,0 +1,77 @@
+"""
+Read-ahead of input workbooks for sequential extraction.
+
+On a network share most of the time of a sequential run is spent waiting for file reads.
+read_ahead() reads the raw bytes of the next files on a small thread pool while the current
+one is being parsed, and hands them to the parser as in-memory buffers in input order. At most
+`depth` files are read ahead, and no more than `max_bytes` of file content is held at once
+(a single larger file is still read, on its own), so memory stays bounded however many files
+there are.
+"""
+import hashlib
+import io
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_READ_AHEAD = 4  # files
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024  # 256 MB of file content in memory
+DEFAULT_THREADS = 2
+
+def _read_bytes(path):
+    """Reads a file and hashes it on the reading thread; returns (content, SHA-256 hex digest)."""
+    with open(path, "rb") as f:
+        data = f.read()
+    return data, hashlib.sha256(data).hexdigest()
+
+def _file_size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+def read_ahead(paths, depth=DEFAULT_READ_AHEAD, max_bytes=DEFAULT_MAX_BYTES, threads=DEFAULT_THREADS, digests=None):
+    """
+    Yields (path, source) for every path in input order, where source is a BytesIO with the
+    file's content read in the background. A file that cannot be read ahead is yielded with its
+    path as source, so the parser opens it itself and reports the error as usual. The buffer of
+    a file is released once the consumer asks for the next one. depth < 1 disables read-ahead.
+    If digests is a dict, the SHA-256 hex digest of every file read ahead is stored in it under
+    its path, so a cache does not have to read the file a second time to hash it.
+    """
+    paths = list(paths)
+    if depth is None or depth < 1:
+        for path in paths:
+            yield path, path
+        return
+
+    executor = ThreadPoolExecutor(max_workers=max(1, min(threads, depth)), thread_name_prefix="read-ahead")
+    pending = deque()  # (path, size, future) in input order
+    held_bytes = 0
+    next_index = 0
+    try:
+        while pending or next_index < len(paths):
+            # Queue reads until depth files or max_bytes are in flight
+            while next_index < len(paths) and len(pending) < depth:
+                size = _file_size(paths[next_index])
+                if pending and held_bytes + size > max_bytes:
+                    break
+                pending.append((paths[next_index], size, executor.submit(_read_bytes, paths[next_index])))
+                held_bytes += size
+                next_index += 1
+
+            path, size, future = pending.popleft()
+            try:
+                data, digest = future.result()
+                source = io.BytesIO(data)
+                if digests is not None:
+                    digests[path] = digest
+            except OSError:
+                source = path
+            yield path, source
+            source = data = None
+            held_bytes -= size
+    finally:
+        for _, _, future in pending:
+            future.cancel()
+        executor.shutdown(wait=True)
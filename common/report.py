@@ -0,0 +1,80 @@
+"""
+Shared reporting core of the MA and MB scripts.
+
+A ReportFormat adapter describes what differs between the customer formats: the calendar
+week labels, whether missing weeks between the first and the last are filled in, and the order
+of the customer items. Everything else (the one-pass pivot build, the styled workbook and the
+csv/parquet writers) is shared, so both pipelines take the same fast path and a new customer
+format only needs a new adapter.
+"""
+from dataclasses import dataclass
+
+from common.calendar_weeks import MA_FORMAT, MB_FORMAT, current_week as format_current_week
+from common.columnar import pivot_grid
+from common.outputs import write_grid_outputs
+
+# Customer items listed first, in this order, in the MB Bedarf pivot
+DESIRED_ORDER = [
+    "A2238305705",
+    "A2238305706",
+    "A2068305905",
+    "A2548302703",
+    "A2148308201",
+    "A2978306501",
+    "A2979970200",
+    "A2979970600",
+    "A0005003700",
+    "A0005003101",
+    "A0005004901",
+    "A0005005301",
+    "A0005002901",
+]
+
+def sorted_items(customer_items):
+    """Sorts customer items alphabetically."""
+    return sorted(customer_items)
+
+def order_customer_items(customer_items, desired_order=DESIRED_ORDER):
+    """Sorts customer items by their position in desired_order; the others keep their order at the end."""
+    return sorted(customer_items, key=lambda x: (desired_order.index(x) if x in desired_order else len(desired_order)))
+
+@dataclass(frozen=True)
+class ReportFormat:
+    """
+    Adapter of one customer format: week_format is the calendar week label format, fill_gaps
+    adds the weeks missing between the first and the last with 0, and order_items takes the
+    customer items in order of first appearance and returns them in report order.
+    """
+    name: str
+    week_format: str
+    fill_gaps: bool = False
+    order_items: object = sorted_items
+
+MA_REPORT = ReportFormat("MA", MA_FORMAT, fill_gaps=True, order_items=sorted_items)
+MB_REPORT = ReportFormat("MB", MB_FORMAT, fill_gaps=False, order_items=order_customer_items)
+
+def report_current_week(report_format):
+    """Returns the current calendar week in the format's week labels."""
+    return format_current_week(report_format.week_format)
+
+def build_grid(demand, report_format):
+    """
+    Pivots a demand frame (see common.columnar) into the report grid of a format in one pass:
+    customer items in report order x calendar week labels, missing quantities 0.
+    """
+    grid = pivot_grid(demand, fill_gaps=report_format.fill_gaps, fmt=report_format.week_format)
+    if grid.empty:
+        return grid
+    return grid.loc[report_format.order_items(grid.index)]
+
+def write_report(grid, output_file, report_format, formats=("xlsx",), write_only=False, changed_cells=None,
+                 current_week=None):
+    """
+    Writes a report grid in every selected format ("xlsx", "csv", "parquet"); the xlsx report
+    highlights current_week (default: this week) and changed_cells.
+    Returns (written paths, whether the current week was highlighted).
+    """
+    if current_week is None:
+        current_week = report_current_week(report_format)
+    return write_grid_outputs(grid, output_file, current_week, formats, write_only=write_only,
+                              changed_cells=changed_cells)
@@ -0,0 +1,136 @@
+"""
+Cheap format detection of input workbooks before any heavy parsing.
+
+An .xlsx file is a zip container; sniff_workbook() reads only the sheet list
+(xl/workbook.xml and its relationships) and the first non-empty row of the first sheet, with
+the shared strings it references, and stops there. That is enough to tell an MB call-off
+(it has the Bedarf sheet) from an MA export (its header has the required columns) from an
+unrelated spreadsheet, in milliseconds instead of a full parse.
+"""
+import posixpath
+import zipfile
+import xml.etree.ElementTree as ET
+
+from common.ma_extract import REQUIRED_COLUMNS
+from common.mb_extract import BEDARF_SHEET
+
+MA, MB, UNKNOWN = "MA", "MB", "unknown"
+
+RELATIONSHIP_ID = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}id"
+# Rows scanned for the header before a sheet is considered unknown
+MAX_HEADER_ROWS = 50
+
+def _local(tag):
+    """Strips the namespace of an XML tag, so transitional and strict OOXML both match."""
+    return tag.rsplit("}", 1)[-1]
+
+def _relationship_id(element):
+    for key, value in element.attrib.items():
+        if key == RELATIONSHIP_ID or _local(key) == "id":
+            return value
+    return None
+
+def _part_path(target, base="xl"):
+    """Resolves a relationship target to a path inside the zip container."""
+    if target.startswith("/"):
+        return target.lstrip("/")
+    return posixpath.normpath(posixpath.join(base, target))
+
+def read_sheet_list(zf):
+    """Returns [(sheet name, part path)] of a workbook in sheet order."""
+    targets = {}
+    with zf.open("xl/_rels/workbook.xml.rels") as f:
+        for _, element in ET.iterparse(f):
+            if _local(element.tag) == "Relationship":
+                targets[element.get("Id")] = _part_path(element.get("Target", ""))
+    sheets = []
+    with zf.open("xl/workbook.xml") as f:
+        for _, element in ET.iterparse(f):
+            if _local(element.tag) == "sheet":
+                sheets.append((element.get("name"), targets.get(_relationship_id(element))))
+    return sheets
+
+def _shared_strings(zf, indexes):
+    """Returns {index: text} of the requested shared strings, reading no further than needed."""
+    if not indexes or "xl/sharedStrings.xml" not in zf.namelist():
+        return {}
+    last = max(indexes)
+    strings = {}
+    index = 0
+    with zf.open("xl/sharedStrings.xml") as f:
+        for _, element in ET.iterparse(f):
+            if _local(element.tag) != "si":
+                continue
+            if index in indexes:
+                # Rich text runs are concatenated; phonetic hints are left out
+                phonetic = _phonetic_texts(element)
+                strings[index] = "".join(t.text or "" for t in element.iter()
+                                         if _local(t.tag) == "t" and t not in phonetic)
+            element.clear()
+            index += 1
+            if index > last:
+                break
+    return strings
+
+def _phonetic_texts(si):
+    return {t for child in si if _local(child.tag) == "rPh" for t in child.iter()}
+
+def read_header_row(zf, sheet_path):
+    """Returns the values of the first non-empty row of a sheet part as text, or []."""
+    cells = []
+    scanned = 0
+    with zf.open(sheet_path) as f:
+        for _, element in ET.iterparse(f):
+            if _local(element.tag) != "row":
+                continue
+            for cell in element:
+                if _local(cell.tag) != "c":
+                    continue
+                kind = cell.get("t")
+                if kind == "inlineStr":
+                    value = "".join(t.text or "" for t in cell.iter() if _local(t.tag) == "t")
+                else:
+                    value = next((v.text for v in cell if _local(v.tag) == "v"), None)
+                if value not in (None, ""):
+                    cells.append((kind, value))
+            element.clear()
+            scanned += 1
+            if cells or scanned >= MAX_HEADER_ROWS:
+                break
+    strings = _shared_strings(zf, {int(value) for kind, value in cells if kind == "s"})
+    return [strings.get(int(value), "") if kind == "s" else value for kind, value in cells]
+
+def sniff_workbook(source):
+    """
+    Classifies a workbook (path or binary file-like object) as MA, MB or UNKNOWN from its sheet
+    list and header row. Returns None if the file is not a readable .xlsx container (e.g. an old
+    .xls or a corrupted file), so the caller can leave the verdict to the real parser.
+    """
+    try:
+        with zipfile.ZipFile(source) as zf:
+            sheets = read_sheet_list(zf)
+            if any(name == BEDARF_SHEET for name, _ in sheets):
+                return MB
+            if not sheets or sheets[0][1] is None:
+                return UNKNOWN
+            header = read_header_row(zf, sheets[0][1])
+    except (zipfile.BadZipFile, KeyError, ET.ParseError, OSError, ValueError):
+        return None
+    finally:
+        if hasattr(source, "seek"):
+            source.seek(0)
+    return MA if all(column in header for column in REQUIRED_COLUMNS) else UNKNOWN
+
+def select_files(paths, expected):
+    """
+    Sniffs every path and splits them into the files to parse (those of the expected format or
+    that could not be sniffed) and {path: detected format} of the files to skip.
+    """
+    selected, skipped = [], {}
+    for path in paths:
+        detected = sniff_workbook(path)
+        if detected is None or detected == expected:
+            selected.append(path)
+        else:
+            skipped[path] = detected
+    return selected, skipped
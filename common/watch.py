@@ -0,0 +1,58 @@
+"""
+Polling watch loop used by the --watch mode of the MA and MB scripts.
+
+The input folder is polled with os.scandir (no extra dependency, works on network shares).
+A burst of file drops is debounced: the callback only runs once the folder has been quiet for
+`debounce` seconds, and it is told which files changed or disappeared since the last call, so
+the scripts only re-extract those and rebuild the reports from their in-memory results.
+"""
+import os
+import time
+
+# Excel lock files of workbooks that are open in Excel
+LOCK_FILE_PREFIX = "~$"
+
+def snapshot(directory, accept):
+    """Returns {path: (size, mtime_ns)} of the files in directory whose name passes accept."""
+    files = {}
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.name.startswith(LOCK_FILE_PREFIX) or not accept(entry.name):
+                continue
+            try:
+                if entry.is_file():
+                    stat = entry.stat()
+                    files[entry.path] = (stat.st_size, stat.st_mtime_ns)
+            except OSError:
+                # The file vanished between listing and stat
+                continue
+    return files
+
+def watch_directory(directory, accept, on_change, interval=1.0, debounce=2.0):
+    """
+    Watches directory until interrupted with Ctrl+C. on_change(changed, removed) is called once
+    with every accepted file at start-up and then after each burst of changes has settled for
+    debounce seconds; changed lists new or modified paths in directory order, removed the paths
+    that disappeared. Errors raised by on_change are printed and the watch goes on.
+    """
+    print(f"Watching {directory} for changes (press Ctrl+C to stop)...")
+    processed = {}
+    seen = snapshot(directory, accept)
+    last_change = time.monotonic() - debounce
+    try:
+        while True:
+            if seen != processed and time.monotonic() - last_change >= debounce:
+                changed = [path for path, signature in seen.items() if processed.get(path) != signature]
+                removed = [path for path in processed if path not in seen]
+                try:
+                    on_change(changed, removed)
+                except Exception as e:
+                    print(f"Error while refreshing: {e}")
+                processed = seen
+            time.sleep(interval)
+            current = snapshot(directory, accept)
+            if current != seen:
+                seen = current
+                last_change = time.monotonic()
+    except KeyboardInterrupt:
+        print("\nStopped watching.")
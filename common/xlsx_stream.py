@@ -0,0 +1,134 @@
+"""
+Streaming workbook readers built on openpyxl's read-only row iteration.
+
+Only the columns or rows a script needs are kept, so memory no longer grows with the width of
+the sheet. Peak memory per file is roughly:
+
+- the read-only parser itself: one row of cells at a time plus the workbook's shared string
+  table (every distinct text value in the file), independent of the number of rows;
+- plus the retained values: at most chunk_size rows x requested columns for
+  iter_column_chunks, kept rows x sheet width for read_sheet_rows.
+
+Cell values are converted the way pandas.read_excel converts them (empty cells become NaN,
+integral floats become ints), so the resulting DataFrames compare equal to a full read.
+
+Legacy .xls files are not zip containers and cannot be streamed by openpyxl; open_workbook()
+reads them fully with pandas.read_excel (through xlrd) instead, and read_sheet_rows() filters
+those sheets the same way.
+"""
+import warnings
+import zipfile
+
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+
+def _convert_cell(value):
+    """Converts a raw openpyxl value like pandas.read_excel: empty cells become NaN, 2.0 becomes 2."""
+    if value is None or value == "":
+        return np.nan
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+def _trimmed_length(values):
+    """Returns the length of a row without its trailing empty cells."""
+    length = len(values)
+    while length and (values[length - 1] is None or values[length - 1] == ""):
+        length -= 1
+    return length
+
+def open_read_only(source):
+    """Opens a workbook (path or file-like object) in read-only, values-only mode."""
+    with warnings.catch_warnings():
+        warnings.filterwarnings("ignore", message="Workbook contains no default style")
+        return load_workbook(source, read_only=True, data_only=True, keep_links=False)
+
+class LegacyWorkbook:
+    """The sheets of a legacy .xls workbook, read in full with pandas.read_excel (needs xlrd)."""
+
+    def __init__(self, source):
+        self.sheets = pd.read_excel(source, sheet_name=None, header=None)
+
+    def close(self):
+        self.sheets = None
+
+def is_zip_container(source):
+    """Returns True if source (path or binary file-like object) is a zip container such as .xlsx."""
+    try:
+        return zipfile.is_zipfile(source)
+    finally:
+        if hasattr(source, "seek"):
+            source.seek(0)
+
+def open_workbook(source):
+    """
+    Opens a workbook for read_sheet_rows: .xlsx files in read-only mode, anything else (a legacy
+    .xls) as a LegacyWorkbook. Call close() on the result when done.
+    """
+    if is_zip_container(source):
+        return open_read_only(source)
+    return LegacyWorkbook(source)
+
+DEFAULT_CHUNK_SIZE = 50000
+
+def iter_column_chunks(source, columns, sheet_name=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Streams a sheet (the first one by default) and returns an iterator of DataFrames of at most
+    chunk_size rows, each holding only the requested header columns. The header is the first
+    non-empty row; blank rows are skipped. The header is checked before returning, so a
+    missing column raises KeyError right away. The workbook is closed once the iterator is
+    exhausted or closed.
+    """
+    wb = open_read_only(source)
+    try:
+        ws = wb[sheet_name] if sheet_name is not None else wb.worksheets[0]
+        rows = ws.iter_rows(values_only=True)
+        header = next((row for row in rows if _trimmed_length(row)), ())
+        positions = []
+        for column in columns:
+            if column not in header:
+                raise KeyError(column)
+            positions.append(header.index(column))
+    except BaseException:
+        wb.close()
+        raise
+
+    def chunks():
+        try:
+            data = []
+            for row in rows:
+                if not _trimmed_length(row):
+                    continue
+                data.append([_convert_cell(row[i]) if i < len(row) else np.nan for i in positions])
+                if len(data) >= chunk_size:
+                    yield pd.DataFrame(data, columns=list(columns))
+                    data = []
+            if data:
+                yield pd.DataFrame(data, columns=list(columns))
+        finally:
+            wb.close()
+
+    return chunks()
+
+def read_sheet_rows(wb, sheet_name, keep, max_col=None, max_row=None):
+    """
+    Streams a sheet of an open read-only workbook and returns a DataFrame with only the rows for
+    which keep(row_index, values) is true, indexed by 0-based sheet row number (as with
+    header=None). Kept rows are padded to the widest row of the sheet so positional slices
+    match a full read.
+    """
+    if isinstance(wb, LegacyWorkbook):
+        df = wb.sheets[sheet_name].iloc[:max_row, :max_col]
+        kept = [row_index for row_index, row in zip(df.index, df.itertuples(index=False, name=None))
+                if keep(row_index, row)]
+        return df.loc[kept]
+    ws = wb[sheet_name]
+    kept = {}
+    width = 0
+    for row_index, row in enumerate(ws.iter_rows(values_only=True, max_col=max_col, max_row=max_row)):
+        width = max(width, _trimmed_length(row))
+        if keep(row_index, row):
+            kept[row_index] = [_convert_cell(value) for value in row]
+    data = [values[:width] + [np.nan] * (width - len(values)) for values in kept.values()]
+    return pd.DataFrame(data, index=list(kept.keys()), columns=range(width))
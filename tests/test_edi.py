@@ -0,0 +1,62 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.calendar_weeks import MB_FORMAT, format_week, iso_week_ordinal
+from common.columnar import abs_frame, ruckstand_frame
+from common.edi import (ABS_COLUMN, DEFAULT_EDI_LAYOUT, NEW_ABS_COLUMN, NEW_SACHNUMMER_COLUMN, RUCKSTAND_COLUMN,
+                        SACHNUMMER_COLUMN, build_edi_index, has_changes, plan_edi_update)
+
+WEEK = iso_week_ordinal(2026, 42)
+QUANTITY_COLUMN = DEFAULT_EDI_LAYOUT.quantity_column(0)
+
+def sheet_row(sachnummer, abs_value, ruckstand=None, quantity=None):
+    values = [None] * QUANTITY_COLUMN
+    values[SACHNUMMER_COLUMN - 1] = sachnummer
+    values[ABS_COLUMN - 1] = abs_value
+    values[RUCKSTAND_COLUMN - 1] = ruckstand
+    values[QUANTITY_COLUMN - 1] = quantity
+    return tuple(values)
+
+def header_row(week=WEEK):
+    values = [None] * QUANTITY_COLUMN
+    values[QUANTITY_COLUMN - 1] = format_week(week, MB_FORMAT)
+    return tuple(values)
+
+def plan(rows, entries, week=WEEK):
+    """Plans writing entries of (Sachnummer, ABS, Rückstand, quantity of the current week) into rows."""
+    abs_data = abs_frame([e[0] for e in entries], [e[1] for e in entries], [0] * len(entries),
+                         [week] * len(entries), [e[3] for e in entries])
+    ruckstand = ruckstand_frame([e[0] for e in entries], [e[1] for e in entries], [e[2] for e in entries])
+    return plan_edi_update(build_edi_index(rows), abs_data, ruckstand)
+
+def test_unchanged_sheet_plans_nothing():
+    result = plan([header_row(), sheet_row("A1", "100", 3, 40)], [("A1", "100", 3.0, 40.0)])
+    assert not has_changes(result["summary"])
+    assert result["cells"] == [] and result["new_rows"] == [] and result["header_cells"] == []
+
+def test_prefixed_abs_cell_matches_and_is_stripped():
+    result = plan([header_row(), sheet_row("A1", "ABS 100", 3, 40)], [("A1", "100", 3.0, 40.0)])
+    assert result["prefixed_cells"] == [(2, "100")]
+    assert result["row_numbers"] == {("A1", "100"): 2}
+    assert result["new_rows"] == [] and result["cells"] == []
+    assert result["summary"]["cells_changed"] == 1
+
+def test_repeated_new_key_adds_one_row():
+    entries = [("B2", "200", 1.0, 10.0), ("A1", "100", 3.0, 40.0), ("B2", "200", 1.0, 12.5)]
+    result = plan([header_row(), sheet_row("A1", "100", 3, 40)], entries)
+    key = ("B2", "200")
+    assert result["new_rows"] == [key]
+    assert result["summary"]["rows_added"] == 1
+    assert (key, NEW_SACHNUMMER_COLUMN, "B2") in result["cells"]
+    assert (key, NEW_ABS_COLUMN, "200") in result["cells"]
+    # The last quantity of the repeated key wins, the unchanged Rückstand is not written again
+    assert [cell for cell in result["cells"] if cell[1] == QUANTITY_COLUMN] == [(key, QUANTITY_COLUMN, 10), (key, QUANTITY_COLUMN, 12.5)]
+    assert [cell for cell in result["cells"] if cell[1] == RUCKSTAND_COLUMN] == [(key, RUCKSTAND_COLUMN, 1)]
+
+def test_header_only_change():
+    result = plan([header_row(WEEK - 1), sheet_row("A1", "100", 3, 40)], [("A1", "100", 3.0, 40.0)])
+    assert result["cells"] == []
+    assert result["header_cells"] == [(QUANTITY_COLUMN, format_week(WEEK, MB_FORMAT))]
+    assert result["summary"] == {"rows_added": 0, "rows_changed": 0, "cells_changed": 0, "header_cells_changed": 1}
+    assert has_changes(result["summary"])